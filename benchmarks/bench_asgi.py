@@ -0,0 +1,107 @@
+"""
+Load test of the sync WSGI (gunicorn sync workers) and async ASGI (uvicorn) serving modes.
+
+    $ pipenv run python benchmarks/bench_asgi.py --concurrency 500 --duration 30
+
+Both servers run the same number of worker processes against the same database
+(DATABASE_URL, or a seeded SQLite file when unset). Prints requests/sec and
+latency percentiles per mode and writes them to --output.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+sys.path.append(SRC)
+sys.path.append(os.path.dirname(__file__))
+
+from loadgen import load
+
+PATHS = [
+    "/api/v1/people?limit=50",
+    "/api/v1/people/1",
+    "/api/v1/planets?limit=50",
+    "/api/v1/planets/1",
+    "/api/v1/users?limit=50",
+    "/api/v1/users/favorites?user_id=1&expand=planet,character",
+]
+
+MODES = {
+    "wsgi": lambda workers, port: ["gunicorn", "wsgi", "--chdir", SRC, "-w", str(workers), "-b", f"127.0.0.1:{port}"],
+    "asgi": lambda workers, port: ["uvicorn", "asgi:application", "--app-dir", SRC, "--workers", str(workers),
+                                   "--port", str(port), "--log-level", "warning"],
+}
+
+
+def seed(rows):
+    from sqlalchemy import insert
+    from app import create_app
+    from models import db, Character, Favorite, Planet, User, enumFaction, enumRole
+
+    factions, roles = list(enumFaction), list(enumRole)
+    with create_app().app_context():
+        db.create_all()
+        if db.session.query(Character.ID).first() is not None:
+            return
+        db.session.execute(insert(Character), [
+            {"fullname": f"Character {i}", "age": i % 90, "faction": factions[i % len(factions)], "type": roles[i % len(roles)]}
+            for i in range(rows)])
+        db.session.execute(insert(Planet), [
+            {"name": f"Planet {i}", "size": i * 1.5, "inhabited": i % 2 == 0, "distance": i * 10.0} for i in range(rows)])
+        db.session.execute(insert(User), [
+            {"username": f"user{i}", "password": "x", "firstname": "First", "lastname": "Last", "email": f"user{i}@example.com"}
+            for i in range(rows)])
+        db.session.execute(insert(Favorite), [
+            {"user_id": 1, "planet_id": i + 1, "character_id": None} for i in range(20)] + [
+            {"user_id": 1, "planet_id": None, "character_id": i + 1} for i in range(20)])
+        db.session.commit()
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_output.json"))
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_asgi.db"))
+    seed(args.rows)
+
+    results = {}
+    for mode in args.modes.split(","):
+        server = subprocess.Popen(MODES[mode](args.workers, args.port), env=os.environ.copy())
+        try:
+            wait_for_port(args.port)
+            load("127.0.0.1", args.port, PATHS, concurrency=10, duration=2)  # warm up
+            results[mode] = load("127.0.0.1", args.port, PATHS, args.concurrency, args.duration).to_dict()
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode}: {results[mode]}")
+
+    with open(args.output, "w") as f:
+        json.dump({"concurrency": args.concurrency, "workers": args.workers, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compares the two FEED_STRATEGY modes of /feed for readers following 10k
+accounts: page latency of fan-out on read against fan-out on write, and what
+each costs when a post is created.
+
+    $ pipenv run python benchmarks/bench_feed.py
+    $ pipenv run python benchmarks/bench_feed.py --followed 1000 --posts-per-author 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "bench_feed.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_FILE
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import insert, select, text
+from app import create_app
+from models import db, Follower, Planet, Post, Timeline, User, enumPost
+from feed import rebuild_timelines
+
+app = create_app({"ENABLE_ADMIN": False, "ENABLE_SWAGGER": False})
+BATCH = 50_000
+
+
+def insert_batches(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            db.session.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+
+
+def load(readers, followed, posts_per_author, seed):
+    """Users 1..readers each follow every author, users readers+1..readers+followed."""
+    rng, today = random.Random(seed), date(2025, 1, 1)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(text("PRAGMA synchronous=OFF"))
+    start = time.perf_counter()
+    users = readers + followed
+    insert_batches(User.__table__, ({"ID": i, "username": f"user{i}", "password": "x", "firstname": "f",
+                                     "lastname": "l", "email": f"user{i}@example.com"} for i in range(1, users + 1)))
+    db.session.execute(insert(Planet), [{"ID": 1, "name": "Tatooine", "size": 1.0, "inhabited": True, "distance": 1.0}])
+    insert_batches(Follower.__table__, ({"user_from_id": reader, "user_to_id": author}
+                                        for reader in range(1, readers + 1) for author in range(readers + 1, users + 1)))
+    insert_batches(Post.__table__, ({"description": f"post {n}", "type": enumPost.Planet.name,
+                                     "creation_date": today - timedelta(days=rng.randint(0, 1000)),
+                                     "user_id": author, "planet_id": 1}
+                                    for author in range(readers + 1, users + 1) for n in range(posts_per_author)))
+    db.session.commit()
+    rebuild_timelines(db.session.connection())
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    count = lambda model: db.session.execute(select(db.func.count()).select_from(model)).scalar()
+    print(f"{readers} readers following {followed:,} accounts each, {count(Post):,} posts, "
+          f"{count(Timeline):,} timeline rows (loaded in {time.perf_counter() - start:.1f}s)")
+
+
+def median(samples):
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def time_pages(client, reader, pages, repeat):
+    """Median latency of the first page and of the page reached after `pages` cursor hops."""
+    first, deep = [], []
+    for _ in range(repeat):
+        url = f"/api/v1/feed?user_id={reader}"
+        for page in range(pages + 1):
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.status_code
+            if page == 0:
+                first.append(elapsed)
+            url = f"/api/v1/feed?user_id={reader}&after={response.headers['X-Next-Cursor']}"
+        deep.append(elapsed)
+    return median(first), median(deep)
+
+
+def time_posts(client, author, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post("/api/v1/posts", json={"user_id": author, "description": "new", "planet_id": 1})
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.status_code
+    return median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--followed", type=int, default=10_000)
+    parser.add_argument("--posts-per-author", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20, help="Cursor hops for the deep page timing.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        load(args.readers, args.followed, args.posts_per_author, args.seed)
+        client = app.test_client()
+        print(f"median of {args.repeat}, 50 posts per page, new posts fan out to {args.readers} followers")
+        print(f"  {'strategy':10} {'first page':>12} {'page ' + str(args.pages + 1):>12} {'create post':>12}")
+        for strategy in ("read", "write"):
+            app.config["FEED_STRATEGY"] = strategy
+            first, deep = time_pages(client, 1, args.pages, args.repeat)
+            post = time_posts(client, args.readers + 1, args.repeat)
+            print(f"  {strategy:10} {first * 1000:9.2f} ms {deep * 1000:9.2f} ms {post * 1000:9.2f} ms")
+    os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Times the follower graph endpoints on a generated graph where a few hub users
+are followed by everybody (1M followers each at the default size), then again
+without the (user_to_id, user_from_id) index to show what it buys.
+
+    $ pipenv run python benchmarks/bench_followers.py
+    $ pipenv run python benchmarks/bench_followers.py --users 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "bench_followers.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_FILE
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import insert, text
+from app import create_app
+from models import db, Follower, User
+
+app = create_app({"ENABLE_ADMIN": False, "ENABLE_SWAGGER": False})
+BATCH = 50_000
+
+
+def insert_batches(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            db.session.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+
+
+def edges(users, hubs, per_user, rng):
+    # Everyone follows every hub, plus `per_user` random others; hubs follow each other
+    for user_id in range(1, users + 1):
+        targets = set(range(1, hubs + 1))
+        targets.update(rng.sample(range(hubs + 1, users + 1), per_user))
+        targets.discard(user_id)
+        for target in sorted(targets):
+            yield {"user_from_id": user_id, "user_to_id": target}
+
+
+def load(users, hubs, per_user, seed):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(text("PRAGMA synchronous=OFF"))
+    start = time.perf_counter()
+    insert_batches(User.__table__, ({"ID": i, "username": f"user{i}", "password": "x", "firstname": "f",
+                                     "lastname": "l", "email": f"user{i}@example.com"} for i in range(1, users + 1)))
+    insert_batches(Follower.__table__, edges(users, hubs, per_user, random.Random(seed)))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    count = db.session.execute(text("SELECT count(*) FROM follower")).scalar()
+    print(f"{users:,} users, {count:,} follow edges, {hubs} hubs with {users - 1:,} followers "
+          f"(loaded in {time.perf_counter() - start:.1f}s)")
+
+
+def timed(client, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (path, response.status_code)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def report(client, cases, repeat):
+    for name, path in cases:
+        print(f"  {name:28} {timed(client, path, repeat) * 1000:9.2f} ms   GET {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_001)
+    parser.add_argument("--hubs", type=int, default=2)
+    parser.add_argument("--follows-per-user", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    hub, user, middle = 1, args.hubs + 1, args.users // 2
+    cases = [
+        ("hub followers, first page", f"/api/v1/users/{hub}/followers"),
+        ("hub followers, deep page", f"/api/v1/users/{hub}/followers?after={middle}"),
+        ("hub following", f"/api/v1/users/{hub}/following"),
+        ("hub mutuals", f"/api/v1/users/{hub}/mutuals"),
+        ("user followers", f"/api/v1/users/{user}/followers"),
+        ("user following", f"/api/v1/users/{user}/following"),
+        ("relationship user -> hub", f"/api/v1/users/{user}/relationship/{hub}"),
+        ("user suggestions", f"/api/v1/users/{user}/suggestions"),
+        ("hub suggestions", f"/api/v1/users/{hub}/suggestions"),
+    ]
+    with app.app_context():
+        load(args.users, args.hubs, args.follows_per_user, args.seed)
+        client = app.test_client()
+        print(f"median of {args.repeat}, with both adjacency indexes")
+        report(client, cases, args.repeat)
+
+        db.session.execute(text("DROP INDEX ix_follower_user_to_id"))
+        db.session.commit()
+        print("without ix_follower_user_to_id (\"who follows X\" scans the primary key)")
+        report(client, [case for case in cases if "followers" in case[0] or "mutuals" in case[0]], min(args.repeat, 3))
+    os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load test of each gunicorn.conf.py worker profile.
+
+    $ pipenv run python benchmarks/bench_gunicorn.py --concurrency 200 --duration 30
+
+Starts `gunicorn -c gunicorn.conf.py` once per WEB_WORKER_CLASS, drives it with
+benchmarks/loadgen.py and reports requests/sec, latency percentiles and the
+proportional set size (PSS) of the master plus workers, which shows how much
+memory preload_app shares between them. Results are printed and written to --output.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_asgi import PATHS, ROOT, seed, wait_for_port
+from loadgen import load
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def pss_mb(pid):
+    """PSS of `pid` and its children in MB, None where /proc/<pid>/smaps_rollup isn't available."""
+    total = 0
+    for process in [pid] + children(pid):
+        try:
+            with open(f"/proc/{process}/smaps_rollup") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except (OSError, StopIteration):
+            return None
+    return round(total / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--profiles", default="sync,gthread,gevent,uvicorn")
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_output.json"))
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bench_asgi.db"))
+    seed(args.rows)
+
+    results = {}
+    for profile in args.profiles.split(","):
+        env = dict(os.environ, WEB_WORKER_CLASS=profile, PORT=str(args.port))
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+                                   "--access-logfile", "/dev/null"], cwd=ROOT, env=env)
+        try:
+            wait_for_port(args.port)
+            load("127.0.0.1", args.port, PATHS, concurrency=10, duration=2)  # warm up
+            results[profile] = load("127.0.0.1", args.port, PATHS, args.concurrency, args.duration).to_dict()
+            results[profile]["pss_mb"] = pss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{profile}: {results[profile]}")
+
+    with open(args.output, "w") as f:
+        json.dump({"concurrency": args.concurrency, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Times GET /search over 1M characters and planets generated like seed.py:
+prefixes, full names, typos and a deep page.
+
+    $ pipenv run python benchmarks/bench_search.py
+    $ pipenv run python benchmarks/bench_search.py --entities 100000 --repeat 20
+
+Runs on a throwaway SQLite file (the FTS5 path). Point DATABASE_URL at an
+empty PostgreSQL database to time the tsvector/trigram path instead.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "bench_search.db")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + DB_FILE)
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from seed import generate_characters, generate_planets, load_table
+from app import create_app
+from models import db, Character, Planet
+from search import rebuild_search_index
+
+app = create_app({"ENABLE_ADMIN": False, "ENABLE_SWAGGER": False})
+
+QUERIES = [
+    ("prefix", "luk"),
+    ("prefix", "tat"),
+    ("full name", "luke skywalker"),
+    ("typo", "skywlker"),
+    ("typo", "tatoine"),
+    ("one row", "kenobi 4242"),
+]
+
+
+def load(entities, seed):
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    start = time.perf_counter()
+    with db.engine.connect() as connection:
+        characters = planets = entities // 2
+        load_table(connection, Character, ("ID", "fullname", "age", "faction", "type"),
+                   generate_characters(characters, rng), characters, 50_000)
+        load_table(connection, Planet, ("ID", "name", "size", "inhabited", "distance"),
+                   generate_planets(planets, rng), planets, 50_000)
+        rebuild_search_index(connection)
+        connection.commit()
+    print(f"{entities:,} entities indexed in {time.perf_counter() - start:.1f}s")
+
+
+def timed(client, query_string, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/api/v1/search", query_string=query_string)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    samples.sort()
+    return samples[len(samples) // 2], response.json
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        load(args.entities, args.seed)
+        client = app.test_client()
+        print(f"median of {args.repeat}, 20 results per page")
+        cases = [(kind, {"q": q, "limit": 20}) for kind, q in QUERIES]
+        cases.append(("deep page", {"q": "skywlker", "limit": 20, "after": 500}))
+        for kind, query_string in cases:
+            elapsed, results = timed(client, query_string, args.repeat)
+            top = results[0].get("fullname") or results[0].get("name") if results else "-"
+            print(f"  {kind:10} {query_string['q']!r:18} {elapsed * 1000:9.1f} ms   top: {top}")
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
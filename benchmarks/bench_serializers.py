@@ -0,0 +1,79 @@
+"""
+Compares the ORM serialize() path with the Core row serializer for the /people listing.
+
+    $ pipenv run python benchmarks/bench_serializers.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "bench_serializers.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_FILE
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert, select
+from app import create_app
+from models import db, Character, enumFaction, enumRole
+from serializers import OrjsonProvider, orjson, serializer_for
+
+app = create_app()
+
+
+def load(rows):
+    factions, roles = list(enumFaction), list(enumRole)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Character), [
+        {"fullname": f"Character {i}", "age": i % 90, "faction": factions[i % len(factions)], "type": roles[i % len(roles)]}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def orm_path(provider):
+    characters = Character.query.all()
+    return provider.dumps([character.serialize() for character in characters])
+
+
+def row_path(provider):
+    serialize = serializer_for(Character)
+    rows = db.session.execute(select(*serialize.columns)).all()
+    return provider.dumps(serialize.many(rows))
+
+
+def timed(fn, provider, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn(provider)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        load(args.rows)
+        providers = [("default json", DefaultJSONProvider(app))]
+        if orjson is not None:
+            providers.append(("orjson", OrjsonProvider(app)))
+
+        baseline = timed(orm_path, providers[0][1], args.repeat)
+        print(f"{args.rows} rows, best of {args.repeat}")
+        print(f"  orm serialize() + default json: {baseline * 1000:8.1f} ms")
+        for name, provider in providers:
+            elapsed = timed(row_path, provider, args.repeat)
+            print(f"  row serializer + {name:13}: {elapsed * 1000:8.1f} ms  ({baseline / elapsed:.1f}x)")
+    os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Measures CATALOG_SNAPSHOT on characters and planets generated like seed.py:
+the memory each representation of a row costs (ORM objects, Core rows
+serialized to dicts, the snapshot's encoded buffer), and requests per second
+of the catalog endpoints served from the database against from memory.
+
+    $ pipenv run python benchmarks/bench_snapshot.py
+    $ pipenv run python benchmarks/bench_snapshot.py --entities 1000000 --requests 2000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DB_FILE = os.path.join(tempfile.gettempdir(), "bench_snapshot.db")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + DB_FILE)
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import select
+from seed import generate_characters, generate_planets, load_table
+from app import create_app
+from models import db, Character, Planet
+from serializers import serializer_for
+from snapshot import CatalogSnapshot
+
+CONFIG = {"ENABLE_ADMIN": False, "ENABLE_SWAGGER": False}
+database_app = create_app(dict(CONFIG, CATALOG_SNAPSHOT=False))
+snapshot_app = create_app(dict(CONFIG, CATALOG_SNAPSHOT=True))
+
+
+def load(entities, seed):
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    with db.engine.connect() as connection:
+        characters = planets = entities // 2
+        load_table(connection, Character, ("ID", "fullname", "age", "faction", "type"),
+                   generate_characters(characters, rng), characters, 50_000)
+        load_table(connection, Planet, ("ID", "name", "size", "inhabited", "distance"),
+                   generate_planets(planets, rng), planets, 50_000)
+
+
+def allocated(build):
+    """Bytes still allocated by what build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def memory(rows):
+    serialize = serializer_for(Character)
+    cases = [
+        ("ORM objects", lambda: db.session.execute(select(Character)).scalars().all()),
+        ("Core rows as dicts", lambda: serialize.many(db.session.execute(select(*serialize.columns)).all())),
+    ]
+    snapshot = CatalogSnapshot(snapshot_app, poll_seconds=0)
+    with db.engine.connect() as connection:
+        cases.append(("snapshot buffer", lambda: snapshot.load(connection, Character)))
+        print(f"memory of {rows:,} characters")
+        for label, build in cases:
+            size = allocated(build)
+            db.session.expunge_all()
+            print(f"  {label:20} {size / 1024 / 1024:9.1f} MiB {size / rows:9.0f} bytes per row")
+
+
+def throughput(app, url, requests):
+    client = app.test_client()
+    assert client.get(url).status_code == 200
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with database_app.app_context():
+        load(args.entities, args.seed)
+        memory(args.entities // 2)
+
+    middle = args.entities // 4
+    cases = [
+        ("first page", "/api/v1/people"),
+        ("deep page", f"/api/v1/people?after={middle}&limit=100"),
+        ("one person", f"/api/v1/people/{middle}"),
+        ("one planet", f"/api/v1/planets/{middle}"),
+    ]
+    print(f"requests/s over {args.requests} requests, test client")
+    print(f"  {'':12} {'database':>10} {'snapshot':>10}")
+    for label, url in cases:
+        from_database = throughput(database_app, url, args.requests)
+        from_snapshot = throughput(snapshot_app, url, args.requests)
+        print(f"  {label:12} {from_database:10,.0f} {from_snapshot:10,.0f}")
+    repeat = max(args.requests // 100, 3)
+    from_database = throughput(database_app, "/api/v1/people?stream=1", repeat)
+    from_snapshot = throughput(snapshot_app, "/api/v1/people?stream=1", repeat)
+    print(f"  {'full stream':12} {from_database:10,.1f} {from_snapshot:10,.1f}")
+    if os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
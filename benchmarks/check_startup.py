@@ -0,0 +1,70 @@
+"""
+Startup check of the APP_PROFILE=api worker profile against the full one.
+
+    $ pipenv run python benchmarks/check_startup.py --runs 5
+
+Builds the app in fresh interpreters under `python -X importtime` and compares
+the median import time, create_app() wall time and max RSS. Exits with 1 when
+the api profile isn't lighter than the full profile on import time and RSS.
+tests/test_startup.py uses measure() to check which packages each profile imports.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+DEFERRED_PACKAGES = ("flask_admin", "flask_migrate", "flask_swagger", "alembic", "wtforms")
+
+PROBE = """
+import resource, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(round((time.perf_counter() - start) * 1000, 2), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(profile):
+    env = dict(os.environ, APP_PROFILE=profile)
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=SRC, env=env,
+                            capture_output=True, text=True, check=True)
+    imported, import_us = set(), 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        import_us += int(self_us)
+        imported.add(name.strip().split(".")[0])
+    create_ms, rss_kb = result.stdout.split()
+    return {"import_ms": import_us / 1000, "create_app_ms": float(create_ms), "rss_mb": int(rss_kb) / 1024}, imported
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    medians = {}
+    for profile in ("full", "api"):
+        runs = []
+        for _ in range(args.runs):
+            numbers, _ = measure(profile)
+            runs.append(numbers)
+        medians[profile] = {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+        print(f"{profile}: {medians[profile]}")
+
+    failures = []
+    for key in ("import_ms", "rss_mb"):
+        if medians["api"][key] >= medians["full"][key]:
+            failures.append(f"api profile {key} {medians['api'][key]} is not below full {medians['full'][key]}")
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Minimal asyncio HTTP/1.1 load generator, no third party dependencies.
+
+Each of `concurrency` clients keeps one keep-alive connection (reopened when the
+server closes it) and issues requests round-robin over `paths` until
+`duration` seconds have passed. A path is either a string, sent as a GET, or a
+(method, path, json_body) tuple. `paths` can also be an iterator, each of its
+requests is then sent once, which lets writes use a new id every time.
+Responses with a status of `error_status` or above count as errors.
+"""
+import asyncio
+import itertools
+import json
+import time
+
+
+class LoadResult:
+    def __init__(self, latencies, errors, elapsed):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        index = min(len(self.latencies) - 1, int(round(pct / 100 * (len(self.latencies) - 1))))
+        return self.latencies[index]
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    return status, headers.get("connection", "").lower() == "close"
+
+
+def encode_request(host, port, request):
+    method, path, body = ("GET", request, None) if isinstance(request, str) else request
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\n"
+    if body is None:
+        return (head + "\r\n").encode()
+    payload = json.dumps(body).encode()
+    return (head + f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode() + payload
+
+
+async def _client(host, port, requests, deadline, latencies, errors, error_status):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        request = next(requests, None)
+        if request is None:
+            break
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            status, close = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors[0] += 1
+            close, status = True, None
+        else:
+            if status < error_status:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[0] += 1
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(host, port, paths, concurrency=50, duration=10.0, error_status=500):
+    latencies, errors = [], [0]
+    if isinstance(paths, (list, tuple)):
+        requests = itertools.cycle([encode_request(host, port, path) for path in paths])
+    else:
+        requests = (encode_request(host, port, path) for path in paths)
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[_client(host, port, requests, deadline, latencies, errors, error_status)
+                           for _ in range(concurrency)])
+    return LoadResult(latencies, errors[0], time.perf_counter() - start)
+
+
+def load(host, port, paths, concurrency=50, duration=10.0, error_status=500):
+    return asyncio.run(run_load(host, port, paths, concurrency, duration, error_status))
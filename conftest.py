@@ -0,0 +1,66 @@
+"""
+Shared pytest fixtures. Query counts per route can be pinned with
+
+    def test_people_list(client, assert_max_queries):
+        with assert_max_queries(2):
+            client.get("/api/v1/people").close()
+"""
+import os
+import sys
+from contextlib import contextmanager
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from app import create_app
+from models import db, Character, Planet, User, enumFaction, enumRole
+from query_budget import QueryCounter
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "ENABLE_ADMIN": False,
+        "ENABLE_MIGRATE": False,
+        "ENABLE_SWAGGER": False,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def sample_data(app):
+    """Users 1-3, planets 1-3 and characters 1-3."""
+    for i in range(1, 4):
+        db.session.add_all([
+            User(ID=i, username=f"user{i}", password="x", firstname="First", lastname="Last", email=f"user{i}@example.com"),
+            Planet(ID=i, name=f"Planet {i}", size=1000.0 * i, inhabited=i % 2 == 1, distance=10.0 * i),
+            Character(ID=i, fullname=f"Character {i}", age=20 + i, faction=list(enumFaction)[i], type=list(enumRole)[i]),
+        ])
+    db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Fails when the block runs more than `limit` statements or repeats one more than `repeat_limit` times."""
+    @contextmanager
+    def check(limit, repeat_limit=1):
+        with QueryCounter() as counter:
+            yield counter
+        problems = []
+        if counter.count > limit:
+            problems.append(f"expected at most {limit} statements")
+        if counter.repeated(repeat_limit):
+            problems.append(f"statements repeated more than {repeat_limit} times")
+        assert not problems, "; ".join(problems) + "\n" + counter.report(repeat_limit)
+    return check
@@ -0,0 +1,99 @@
+"""
+Gunicorn settings for production, used by the Procfile and render.yaml:
+
+    $ gunicorn -c gunicorn.conf.py
+
+Everything can be tuned from the environment:
+
+    WEB_WORKER_CLASS     sync | gthread (default) | gevent | uvicorn (serves asgi:application)
+    WEB_CONCURRENCY      worker processes, defaults to 2 * CPUs + 1 for sync and CPUs + 1 otherwise
+    WEB_THREADS          threads per gthread worker (default 4)
+    WEB_CONNECTIONS      concurrent requests per gevent worker (default 1000)
+    WEB_PRELOAD          import the app once in the master before forking (default 1)
+    WEB_MAX_REQUESTS     recycle a worker after this many requests, 0 disables (default 1000)
+    WEB_TIMEOUT          seconds before a silent worker is killed (default 30)
+    WEB_KEEPALIVE        seconds to hold idle keep-alive connections (default 5)
+    PORT                 listening port (default 3000)
+
+Keep DB_POOL_SIZE + DB_MAX_OVERFLOW at or above WEB_THREADS, and the total
+across workers under the database's max_connections. See docs/GUNICORN.md
+for the benchmark of each worker class.
+"""
+import gc
+import os
+import sys
+
+
+def _cpus():
+    # Honors container CPU affinity, unlike os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _int_env(name, default):
+    return int(os.getenv(name, default))
+
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "gevent": "gevent",
+    "uvicorn": "uvicorn_worker.UvicornWorker",
+}
+
+worker_kind = os.getenv("WEB_WORKER_CLASS", "gthread").lower()
+if worker_kind not in WORKER_CLASSES:
+    raise RuntimeError(f"WEB_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, got {worker_kind!r}")
+
+if worker_kind == "gevent":
+    # Patch before the app (and its database driver) is preloaded in the master
+    from gevent import monkey
+    monkey.patch_all()
+
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+wsgi_app = "asgi:application" if worker_kind == "uvicorn" else "wsgi"
+bind = f"0.0.0.0:{os.getenv('PORT', 3000)}"
+
+worker_class = WORKER_CLASSES[worker_kind]
+workers = _int_env("WEB_CONCURRENCY", 2 * _cpus() + 1 if worker_kind == "sync" else _cpus() + 1)
+threads = _int_env("WEB_THREADS", 4) if worker_kind == "gthread" else 1
+worker_connections = _int_env("WEB_CONNECTIONS", 1000)
+
+preload_app = os.getenv("WEB_PRELOAD", "1").lower() in ("1", "true", "yes")
+max_requests = _int_env("WEB_MAX_REQUESTS", 1000)
+max_requests_jitter = max_requests // 10
+timeout = _int_env("WEB_TIMEOUT", 30)
+graceful_timeout = timeout
+keepalive = _int_env("WEB_KEEPALIVE", 5)
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # Move everything the preloaded app allocated out of the collector's reach,
+    # so gc passes in the workers don't touch (and copy) the shared pages.
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections opened by the master must not be shared with the children;
+    # close=False leaves the parent's sockets alone and only drops the pool.
+    if not preload_app:
+        return
+    from models import db
+    asgi = sys.modules.get("asgi")
+    flask_app = asgi.flask_app if asgi is not None else server.app.wsgi()
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if asgi is not None:
+        for engine in asgi.async_engines:
+            engine.sync_engine.dispose(close=False)
+    # Load CATALOG_SNAPSHOT before the first request rather than during it
+    snapshot = sys.modules.get("snapshot")
+    if snapshot is not None and snapshot.catalog is not None:
+        snapshot.catalog.ensure_started()
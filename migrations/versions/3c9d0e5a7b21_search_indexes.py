@@ -0,0 +1,42 @@
+"""search indexes
+
+Revision ID: 3c9d0e5a7b21
+Revises: e875b17593ba
+Create Date: 2026-10-18 02:10:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d0e5a7b21'
+down_revision = 'e875b17593ba'
+branch_labels = None
+depends_on = None
+
+# table: searched column, mirrors SEARCH_MODELS in src/search.py
+SEARCHED = {'character': 'fullname', 'planet': 'name'}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, column in SEARCHED.items():
+            op.execute(f'CREATE INDEX ix_{table}_search_trgm ON "{table}" USING gin ({column} gin_trgm_ops)')
+            op.execute(f"CREATE INDEX ix_{table}_search_tsv ON \"{table}\" USING gin (to_tsvector('simple', {column}))")
+    elif dialect == 'sqlite':
+        for table, column in SEARCHED.items():
+            op.execute(f"CREATE VIRTUAL TABLE {table}_search USING fts5({column}, tokenize='trigram')")
+            op.execute(f'INSERT INTO {table}_search (rowid, {column}) SELECT "ID", {column} FROM "{table}"')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHED:
+        if dialect == 'postgresql':
+            op.execute(f'DROP INDEX ix_{table}_search_tsv')
+            op.execute(f'DROP INDEX ix_{table}_search_trgm')
+        elif dialect == 'sqlite':
+            op.execute(f'DROP TABLE {table}_search')
@@ -0,0 +1,35 @@
+"""favorite unique indexes
+
+Revision ID: b78049d29634
+Revises: f1873f62f25f
+Create Date: 2026-10-18 01:24:37.512084
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b78049d29634'
+down_revision = 'f1873f62f25f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest row of any duplicate pair so the unique indexes can be built
+    for column in ('planet_id', 'character_id'):
+        op.execute(
+            f'DELETE FROM favorite WHERE {column} IS NOT NULL AND "ID" NOT IN '
+            f'(SELECT MIN("ID") FROM favorite WHERE {column} IS NOT NULL GROUP BY user_id, {column})'
+        )
+
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.create_index('uq_favorite_user_planet', ['user_id', 'planet_id'], unique=True, postgresql_where=sa.text('planet_id IS NOT NULL'), sqlite_where=sa.text('planet_id IS NOT NULL'))
+        batch_op.create_index('uq_favorite_user_character', ['user_id', 'character_id'], unique=True, postgresql_where=sa.text('character_id IS NOT NULL'), sqlite_where=sa.text('character_id IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_index('uq_favorite_user_character', postgresql_where=sa.text('character_id IS NOT NULL'), sqlite_where=sa.text('character_id IS NOT NULL'))
+        batch_op.drop_index('uq_favorite_user_planet', postgresql_where=sa.text('planet_id IS NOT NULL'), sqlite_where=sa.text('planet_id IS NOT NULL'))
@@ -1,113 +1,230 @@
-import sys
+"""
+Bulk loader of deterministic synthetic data for the current schema.
+
+    $ pipenv run python seed.py                      # ~1k users, 20k favorites
+    $ pipenv run python seed.py --scale 500 --reset  # 500k users, 10M favorites
+
+Rows are generated from --seed, so the same arguments always produce the same
+dataset, with explicit IDs so no lookups are needed between tables. They are
+written in batches of --batch-size: COPY FROM STDIN on PostgreSQL (psycopg2 or
+psycopg), executemany INSERTs anywhere else. Progress goes to stderr.
+"""
+import argparse
+import csv
+import io
+import math
 import os
-from datetime import datetime
-from sqlalchemy.exc import IntegrityError
+import random
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert, text
 
 # Agregar 'src' al path para importar bien
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from app import create_app
-from models import (
-    db, Users, Champions, Items, Stats, Builds, Builditems, Favourites,
-    enumGender, enumRank, enumLane
-)
+from models import db, User, Follower, Character, Planet, Favorite, Post, Media, Timeline, enumFaction, enumRole, enumPost
+from versioning import bump_versions
+from counters import recount_favorites
+from feed import rebuild_timelines
+from search import rebuild_search_index
+
+FIRST_NAMES = ["Luke", "Leia", "Han", "Rey", "Finn", "Poe", "Padme", "Anakin", "Obi-Wan", "Ahsoka", "Din", "Cassian"]
+LAST_NAMES = ["Skywalker", "Organa", "Solo", "Kenobi", "Amidala", "Tano", "Djarin", "Andor", "Erso", "Dameron"]
+PLANET_PREFIXES = ["Tat", "Nab", "Cor", "Hoth", "End", "Kash", "Mus", "Dag", "Bes", "Jak", "Lot", "Scar"]
+PLANET_SUFFIXES = ["ooine", "oo", "uscant", "or", "yyyk", "tafar", "obah", "pin", "ku", "hal", "if"]
+
+BASE_COUNTS = {"users": 1000, "characters": 500, "planets": 500}
+
+
+def generate_users(count, rng):
+    for i in range(1, count + 1):
+        yield (i, f"user{i}", "seed", rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{i}@example.com")
+
+
+def generate_characters(count, rng):
+    factions, roles = [member.name for member in enumFaction], [member.name for member in enumRole]
+    for i in range(1, count + 1):
+        yield (i, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}", rng.randint(8, 900),
+               rng.choice(factions), rng.choice(roles))
+
+
+def generate_planets(count, rng):
+    for i in range(1, count + 1):
+        yield (i, f"{rng.choice(PLANET_PREFIXES)}{rng.choice(PLANET_SUFFIXES)}-{i}", round(rng.uniform(1000, 200000), 1),
+               rng.random() < 0.7, round(rng.uniform(1, 100000), 1))
+
+
+def generate_followers(users, per_user, rng):
+    for user_id in range(1, users + 1):
+        # Offsets in 1..users-1 are distinct, so no duplicate pairs and no self-follows
+        for offset in rng.sample(range(1, users), per_user):
+            yield (user_id, (user_id - 1 + offset) % users + 1)
+
+
+def generate_favorites(users, planets, characters, per_user):
+    favorite_id = 0
+    for user_id in range(1, users + 1):
+        planet_start, character_start = (user_id * 7919) % planets, (user_id * 104729) % characters
+        for j in range(per_user):
+            favorite_id += 1
+            if j % 2 == 0:
+                yield (favorite_id, user_id, (planet_start + j // 2) % planets + 1, None)
+            else:
+                yield (favorite_id, user_id, None, (character_start + j // 2) % characters + 1)
+
+
+def generate_posts(users, planets, characters, per_user, rng):
+    post_id, today = 0, date(2025, 1, 1)
+    for user_id in range(1, users + 1):
+        for _ in range(per_user):
+            post_id += 1
+            if rng.random() < 0.5:
+                yield (post_id, f"Post {post_id} about a planet", enumPost.Planet.name,
+                       today - timedelta(days=rng.randint(0, 1000)), user_id, rng.randint(1, planets), None)
+            else:
+                yield (post_id, f"Post {post_id} about a character", enumPost.Character.name,
+                       today - timedelta(days=rng.randint(0, 1000)), user_id, None, rng.randint(1, characters))
+
 
-app = create_app()
+def generate_media(planets, characters, per_entity):
+    media_id = 0
+    for kind, count in (("planet", planets), ("character", characters)):
+        for entity_id in range(1, count + 1):
+            for k in range(per_entity):
+                media_id += 1
+                url = f"https://picsum.photos/seed/{kind}{entity_id}-{k}/600/400"
+                yield (media_id, url, entity_id, None) if kind == "planet" else (media_id, url, None, entity_id)
 
-with app.app_context():
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_rows(connection, table, columns, rows):
+    """COPY FROM STDIN through the raw DBAPI connection (psycopg2 or psycopg 3)."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    preparer = connection.dialect.identifier_preparer
+    sql = f"COPY {preparer.format_table(table)} ({', '.join(preparer.quote(name) for name in columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.driver_connection.cursor()
     try:
-        # Limpiar datos previos
-        for tbl in (Favourites, Builditems, Builds, Items, Champions, Stats, Users):
-            db.session.query(tbl).delete()
-        db.session.commit()
-
-        users = [
-            Users(username=f"user{i}", nick=f"Nick{i}", gender=enumGender.Male if i % 2 == 0 else enumGender.Female,
-                  rank=enumRank.Diamond if i < 5 else enumRank.Master, mainrole=list(enumLane)[i % len(enumLane)])
-            for i in range(20)
-        ]
-        db.session.add_all(users)
-        db.session.flush()
-
-        # Campeones + stats base
-        champ_data = [
-            ("Ahri", enumLane.Mid, "Mage", 53, 0, 570, 7, 400, 12, 0.625, 0, 0, 20, 30, 0, 0, 0, 0, 330),
-            ("Olaf", enumLane.Jungle, "Fighter", 60, 0, 620, 8, 300, 10, 0.67, 0, 0, 25, 32, 0,0,0,0,350),
-            ("Ashe", enumLane.ADCarry, "Marksman", 59,0,550,6,280,9,0.658,0,0,24,30,0,0,0,0,330),
-            ("Leona", enumLane.Support, "Tank", 64,0,600,8,300,8,0.7,0,0,25,30,0,0,0,0,325),
-            ("Darius", enumLane.Top, "Fighter", 64,0,620,8,0,10,0.638,0,0,36,32,0,0,0,0,340),
-        ]
-        champs = []
-        for name, lane, typ, *stats_vals in champ_data:
-            s = Stats(*stats_vals)
-            db.session.add(s); db.session.flush()
-            c = Champions(name=name, lane=lane, type=typ, media=f"{name.lower()}.png", stat=s)
-            champs.append(c)
-        db.session.add_all(champs)
-        db.session.flush()
-
-        # Items + stats
-        item_data = [
-            ("Blade of the Ruined King", 3200, 40, 0, 0.2, 10, 0),
-            ("Rabadon's Deathcap", 3600, 0, 120, 0, 0, 0),
-            ("Infinity Edge", 3400, 70, 0, 0, 0, 20),
-            ("Thornmail", 2700, 0,0,0,0,0),
-            ("Luden's Tempest", 3000, 0,80,0,0,0),
-        ]
-        items = []
-        for name, price, ad, ap, atspd, lifesteal, spellvamp in item_data:
-            s = Stats(ad=ad, ap=ap, hp=0, hpreg=0, mana=0, manareg=0,
-                      atspeed=atspd, lifesteal=lifesteal, spellvamp=spellvamp,
-                      crit=0, cd=0, armor=0, mresist=0, armorpen=0, magicpen=0,
-                      lethal=0, mvspeed=0)
-            db.session.add(s); db.session.flush()
-            it = Items(name=name, price=price, stats_id=s.id,
-                       description=f"Autogenerated description {name}",
-                       media=f"{name.replace(' ', '').lower()}.png")
-            items.append(it)
-        db.session.add_all(items)
-        db.session.flush()
-
-        # Builds: 20 builds cycling through champs and users
-        builds = []
-        for i in range(20):
-            u = users[i % len(users)]
-            c = champs[i % len(champs)]
-            b = Builds(
-                title=f"Build {c.name} #{i}",
-                description=f"Seed build {i} for {c.name}",
-                champion=c, user=u,
-                creation_date=datetime.utcnow()
-            )
-            builds.append(b)
-        db.session.add_all(builds)
-        db.session.flush()
-
-        # Builditems: assign first item to each build
-        builditems = [
-            Builditems(build=b, item=items[i % len(items)], item_position=1)
-            for i, b in enumerate(builds)
-        ]
-        db.session.add_all(builditems)
-        db.session.flush()
-
-        # Favourites: each user favorites next two builds
-        favourites = []
-        for i, u in enumerate(users):
-            b1 = builds[(i + 1) % len(builds)]
-            b2 = builds[(i + 2) % len(builds)]
-            favourites.extend([Favourites(user=u, build=b1), Favourites(user=u, build=b2)])
-        db.session.add_all(favourites)
-        db.session.commit()
-
-        print("✅ Seed completado correctamente.")
-        print(f"- Users: {len(users)}")
-        print(f"- Champions: {len(champs)}")
-        print(f"- Items: {len(items)}")
-        print(f"- Builds: {len(builds)}")
-        print(f"- Builditems: {len(builditems)}")
-        print(f"- Favourites: {len(favourites)}")
-
-    except IntegrityError as e:
-        db.session.rollback()
-        print("❌ Error en seed:", e)
\ No newline at end of file
+        if connection.dialect.driver == "psycopg2":
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, table, columns, rows):
+    connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def load_table(connection, model, columns, rows, total, batch_size):
+    table = model.__table__
+    use_copy = connection.dialect.name == "postgresql" and connection.dialect.driver in ("psycopg2", "psycopg")
+    write = copy_rows if use_copy else insert_rows
+    done, start = 0, time.perf_counter()
+    for batch in batches(rows, batch_size):
+        write(connection, table, columns, batch)
+        done += len(batch)
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        print(f"\r{table.name}: {done:,}/{total:,} rows ({rate:,.0f} rows/s)", end="", file=sys.stderr, flush=True)
+    print(f"\r{table.name}: {done:,} rows in {time.perf_counter() - start:.1f}s" + " " * 20, file=sys.stderr)
+    bump_versions(connection, [table.name])
+    if connection.dialect.name == "postgresql" and "ID" in table.c:
+        # Explicit IDs don't advance the serial sequence
+        connection.execute(text(f"SELECT setval(pg_get_serial_sequence(:table, 'ID'), "
+                                f"(SELECT coalesce(max(\"ID\"), 0) + 1 FROM {connection.dialect.identifier_preparer.format_table(table)}), false)"),
+                           {"table": connection.dialect.identifier_preparer.format_table(table)})
+    connection.commit()
+
+
+def reset(connection):
+    tables = [model.__table__ for model in (Timeline, Media, Post, Favorite, Follower, Planet, Character, User)]
+    if connection.dialect.name == "postgresql":
+        names = ", ".join(connection.dialect.identifier_preparer.format_table(table) for table in tables)
+        connection.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+    else:
+        for table in tables:
+            connection.execute(table.delete())
+    connection.commit()
+
+
+def load_dataset(connection, scale=1.0, seed=42, batch_size=10000, favorites_per_user=20, posts_per_user=5,
+                 media_per_entity=2, follows_per_user=20, timelines=False):
+    users, characters, planets = (max(2, int(BASE_COUNTS[name] * scale)) for name in ("users", "characters", "planets"))
+    follows_per_user = min(follows_per_user, users - 1)
+    if math.ceil(favorites_per_user / 2) > planets or favorites_per_user // 2 > characters:
+        raise ValueError("favorites per user can't exceed twice the number of planets or characters")
+    rng = random.Random(seed)
+
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+
+    load_table(connection, User, ("ID", "username", "password", "firstname", "lastname", "email"),
+               generate_users(users, rng), users, batch_size)
+    load_table(connection, Character, ("ID", "fullname", "age", "faction", "type"),
+               generate_characters(characters, rng), characters, batch_size)
+    load_table(connection, Planet, ("ID", "name", "size", "inhabited", "distance"),
+               generate_planets(planets, rng), planets, batch_size)
+    rebuild_search_index(connection)
+    connection.commit()
+    load_table(connection, Follower, ("user_from_id", "user_to_id"),
+               generate_followers(users, follows_per_user, rng), users * follows_per_user, batch_size)
+    load_table(connection, Favorite, ("ID", "user_id", "planet_id", "character_id"),
+               generate_favorites(users, planets, characters, favorites_per_user), users * favorites_per_user, batch_size)
+    recount_favorites(connection)
+    connection.commit()
+    load_table(connection, Post, ("ID", "description", "type", "creation_date", "user_id", "planet_id", "character_id"),
+               generate_posts(users, planets, characters, posts_per_user, rng), users * posts_per_user, batch_size)
+    load_table(connection, Media, ("ID", "url", "planet_id", "character_id"),
+               generate_media(planets, characters, media_per_entity), (planets + characters) * media_per_entity, batch_size)
+    if timelines:
+        start = time.perf_counter()
+        rebuild_timelines(connection)
+        connection.commit()
+        print(f"timeline: rebuilt in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplies the base 1000 users, 500 characters and 500 planets.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--posts-per-user", type=int, default=5)
+    parser.add_argument("--media-per-entity", type=int, default=2)
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--reset", action="store_true", help="Empty the tables first.")
+    parser.add_argument("--create-tables", action="store_true", help="Run db.create_all() first, for throwaway databases.")
+    args = parser.parse_args()
+
+    app = create_app({"ENABLE_ADMIN": False, "ENABLE_SWAGGER": False})
+    with app.app_context():
+        if args.create_tables:
+            db.create_all()
+        start = time.perf_counter()
+        with db.engine.connect() as connection:
+            if args.reset:
+                reset(connection)
+            load_dataset(connection, args.scale, args.seed, args.batch_size, args.favorites_per_user,
+                         args.posts_per_user, args.media_per_entity, args.follows_per_user,
+                         timelines=app.config["FEED_STRATEGY"] == "write")
+        print(f"Seed completed in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,49 +3,113 @@ This module takes care of starting the API Server, Loading the DB and Adding the
 """
 import os
 from flask import Flask, request, jsonify, url_for
-from flask_migrate import Migrate
-from flask_swagger import swagger
 from flask_cors import CORS
 from utils import APIException, generate_sitemap
-from admin import setup_admin
+from serializers import setup_json_provider
+from cache import setup_cache
+from commands import setup_commands
+from pool import setup_pool
+from replicas import setup_replicas
+from metrics import setup_metrics
+from query_budget import setup_query_budget
+from snapshot import setup_snapshot
+from feed import FEED_STRATEGIES
+from routes import api
 from models import db, User
 #from models import Person
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+# APP_PROFILE=api leaves out the admin, migrations and swagger (and their imports)
+# for API-only workers; each one can still be switched with its ENABLE_* variable.
+PROFILES = {
+    "full": {"ENABLE_ADMIN": True, "ENABLE_MIGRATE": True, "ENABLE_SWAGGER": True},
+    "api": {"ENABLE_ADMIN": False, "ENABLE_MIGRATE": False, "ENABLE_SWAGGER": False},
+}
 
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-MIGRATE = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-setup_admin(app)
+def _env_flag(name, default):
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
 
-# Handle/serialize errors like a JSON object
-@app.errorhandler(APIException)
-def handle_invalid_usage(error):
-    return jsonify(error.to_dict()), error.status_code
 
-# generate sitemap with all your endpoints
-@app.route('/')
-def sitemap():
-    return generate_sitemap(app)
+def default_config():
+    profile = os.getenv("APP_PROFILE", "full")
+    if profile not in PROFILES:
+        raise RuntimeError(f"APP_PROFILE must be one of {', '.join(PROFILES)}, got {profile!r}")
+    config = {name: _env_flag(name, enabled) for name, enabled in PROFILES[profile].items()}
 
-@app.route('/user', methods=['GET'])
-def handle_hello():
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
+    else:
+        config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-    response_body = {
-        "msg": "Hello, this is your GET /user response "
-    }
+    config["FEED_STRATEGY"] = os.getenv("FEED_STRATEGY", "read")
+    if config["FEED_STRATEGY"] not in FEED_STRATEGIES:
+        raise RuntimeError(f"FEED_STRATEGY must be one of {', '.join(FEED_STRATEGIES)}, got {config['FEED_STRATEGY']!r}")
+    config["CATALOG_SNAPSHOT"] = _env_flag("CATALOG_SNAPSHOT", False)
+    return config
+
+
+def create_app(config=None):
+    """Builds the Flask app; `config` overrides the defaults read from the environment."""
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+    app.config.update(default_config())
+    app.config.update(config or {})
+    setup_json_provider(app)
+    setup_pool(app)
+    setup_replicas(app)
+
+    db.init_app(app)
+    CORS(app)
+    if app.config["ENABLE_MIGRATE"]:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    if app.config["ENABLE_ADMIN"]:
+        from admin import setup_admin
+        setup_admin(app)
+    if app.config["ENABLE_SWAGGER"]:
+        setup_swagger(app)
+    setup_cache(app)
+    setup_commands(app)
+    setup_metrics(app)
+    setup_query_budget(app)
+    setup_snapshot(app)
+    app.register_blueprint(api)
+
+    # Handle/serialize errors like a JSON object
+    @app.errorhandler(APIException)
+    def handle_invalid_usage(error):
+        return jsonify(error.to_dict()), error.status_code
+
+    # generate sitemap with all your endpoints
+    @app.route('/')
+    def sitemap():
+        return generate_sitemap(app)
+
+    @app.route('/user', methods=['GET'])
+    def handle_hello():
+
+        response_body = {
+            "msg": "Hello, this is your GET /user response "
+        }
+
+        return jsonify(response_body), 200
+
+    return app
+
+
+def setup_swagger(app):
+    @app.route('/swagger.json')
+    def swagger_spec():
+        from flask_swagger import swagger
+        spec = swagger(app)
+        spec['info'] = {"title": "Star Wars API", "version": "1.0"}
+        return jsonify(spec)
 
-    return jsonify(response_body), 200
 
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3000))
-    app.run(host='0.0.0.0', port=PORT, debug=False)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=PORT, debug=False)
@@ -0,0 +1,414 @@
+"""
+ASGI entry point, an alternative to wsgi.py. Run it with
+
+    $ uvicorn asgi:application --app-dir src
+    $ WEB_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py
+
+Every GET route of the api blueprint is served by an async handler on a
+sqlalchemy.ext.asyncio engine (asyncpg for PostgreSQL, aiosqlite for SQLite),
+so a request waiting on the database no longer pins a worker. The handlers
+build their statements with the same functions as the Flask views and send
+the same bytes. The writes, the other blueprints and NDJSON streaming are
+handed to the regular Flask app.
+"""
+import random
+from functools import partial, wraps
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.datastructures import Headers, QueryParams
+from starlette.middleware import Middleware
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_date, parse_etags
+import cache
+import snapshot
+from app import create_app
+from counters import top_rows, top_statement
+from feed import feed_statement, split_feed
+from followers import (follow_statement, mutual_statement, relationship, relationship_statement, suggestion_rows,
+                       suggestions_statement)
+from models import Character, Favorite, Media, Planet, Post, User
+from pagination import get_fields, get_page_args, page_headers, page_statement, split_page
+from filters import listing_statement, split_listing
+from metrics import AsgiMetricsMiddleware
+from pool import engine_options
+from related import attach_media, child_statement, media_statement, wants_media
+from replicas import STICKY_COOKIE, is_sticky, replica_urls
+from routes import (api, expanded_tables, favorite_expands, leaderboard_limit, search_kinds, search_page_args,
+                    suggestions_limit)
+from search import SEARCH_MODELS, entity_statements, hits_statement, search_results, search_terms
+from serializers import json_body, serializer_for
+from utils import APIException
+from versioning import is_not_modified, request_tables, validators, versions_from_rows, versions_statement
+
+flask_app = create_app()
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(database_uri):
+    url = make_url(database_uri)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def async_engine(database_uri):
+    url = async_url(database_uri)
+    # Options for the async driver, the PgBouncer connect_args differ per driver
+    options = {key: value for key, value in engine_options(url).items() if key != "poolclass"}
+    return create_async_engine(url, **options)
+
+
+async_engines = [async_engine(flask_app.config["SQLALCHEMY_DATABASE_URI"])] + [async_engine(url) for url in replica_urls()]
+primary_session = async_sessionmaker(async_engines[0])
+replica_sessions = [async_sessionmaker(engine) for engine in async_engines[1:]]
+
+
+def closing(wsgi_app):
+    """
+    WsgiToAsgi never calls close() on the response, where MetricsMiddleware
+    records the request: close it once it has been sent.
+    """
+    def application(environ, start_response):
+        return _closing_body(wsgi_app(environ, start_response))
+    return application
+
+
+def _closing_body(body):
+    try:
+        yield from body
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+
+
+wsgi_application = WsgiToAsgi(closing(flask_app))
+
+
+def read_session(request):
+    if replica_sessions and not is_sticky(_int(request.query_params.get("user_id")), request.cookies.get(STICKY_COOKIE)):
+        return random.choice(replica_sessions)()
+    return primary_session()
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def json_response(data, status_code=200, headers=None):
+    return Response(json_body(data, flask_app), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def conditional(*tables, depends=None):
+    """Async counterpart of versioning.conditional."""
+    def decorator(handler):
+        @wraps(handler)
+        async def endpoint(request):
+            tables_read = request_tables(tables, depends, request.query_params)
+            async with read_session(request) as session:
+                versions = versions_from_rows(tables_read, (await session.execute(versions_statement(tables_read))).all())
+                request.state.table_versions = dict(zip(tables_read, versions))
+                full_path = request.url.path + "?" + request.url.query
+                etag, last_modified = validators(tables_read, versions, full_path + "|" + request.headers.get("accept", ""))
+                if_none_match = parse_etags(request.headers.get("if-none-match"))
+                if is_not_modified(if_none_match, parse_date(request.headers.get("if-modified-since")), etag, last_modified):
+                    response = Response(status_code=304)
+                else:
+                    response = await handler(request, session)
+                    if response.status_code != 200:
+                        return response
+
+            response.headers["ETag"] = f'"{etag}"'
+            if last_modified is not None:
+                response.headers["Last-Modified"] = last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+            response.headers["Vary"] = "Accept"
+            return response
+        return endpoint
+    return decorator
+
+
+def from_snapshot(endpoint):
+    """Answers from the CATALOG_SNAPSHOT copy when it can, like its before_request hook on the Flask side."""
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(request):
+            catalog = snapshot.catalog
+            if catalog is not None:
+                catalog.ensure_started()
+            if catalog is None or not catalog.is_fresh():
+                return await handler(request)
+            base_url = str(request.url.replace(query=""))
+            result = catalog.serve(
+                endpoint, request.path_params, request.query_params,
+                request.url.path + "?" + request.url.query + "|" + request.headers.get("accept", ""),
+                parse_etags(request.headers.get("if-none-match")), parse_date(request.headers.get("if-modified-since")),
+                False, lambda next_cursor: page_headers(next_cursor, base_url, request.query_params))
+            if result is None:
+                return await handler(request)
+            status, body, media_type, headers = result
+            return Response(body, status_code=status, headers=headers, media_type=media_type)
+        return wrapper
+    return decorator
+
+
+async def list_page(request, session, model):
+    limit, after = get_page_args(request.query_params)
+    serialize = serializer_for(model, get_fields(model, request.query_params))
+    rows = (await session.execute(page_statement(model, serialize, limit, after))).all()
+    items, next_cursor = split_page(serialize, rows, limit)
+    return await page_response(request, session, model, items, next_cursor)
+
+
+async def filtered_list_page(request, session, model, media=False):
+    serialize = serializer_for(model, get_fields(model, request.query_params))
+    stmt, limit, field = listing_statement(model, serialize, request.query_params)
+    items, next_cursor = split_listing(serialize, (await session.execute(stmt)).all(), limit, field)
+    return await page_response(request, session, model, items, next_cursor, media)
+
+
+async def page_response(request, session, model, items, next_cursor, media=False):
+    if media and items:
+        attach_media(items, await session.execute(media_statement(model, items)))
+    base_url = str(request.url.replace(query=""))
+    return json_response(items, headers=page_headers(next_cursor, base_url, request.query_params))
+
+
+async def single_entity(request, session, model, entity_id, label):
+    version, _ = request.state.table_versions[model.__tablename__]
+    key = cache.cache_key(model, entity_id, version)
+    body = cache.entity_cache.get(key)
+    if body is None:
+        serialize = serializer_for(model)
+        row = (await session.execute(select(*serialize.columns).where(model.ID == entity_id))).first()
+        if row is None:
+            return json_response({"error": f"{label} not found"}, status_code=404)
+        body = json_body(serialize(row), flask_app)
+        cache.entity_cache.set(key, body)
+    return Response(body, media_type="application/json")
+
+
+@from_snapshot("api.get_all_people")
+@conditional("character", "media")
+async def get_all_people(request, session):
+    return await filtered_list_page(request, session, Character, wants_media(request.query_params))
+
+
+@from_snapshot("api.get_single_person")
+@conditional("character")
+async def get_single_person(request, session):
+    return await single_entity(request, session, Character, request.path_params["character_id"], "Character")
+
+
+@from_snapshot("api.get_all_planets")
+@conditional("planet", "media")
+async def get_all_planets(request, session):
+    return await filtered_list_page(request, session, Planet, wants_media(request.query_params))
+
+
+@from_snapshot("api.get_single_planet")
+@conditional("planet")
+async def get_single_planet(request, session):
+    return await single_entity(request, session, Planet, request.path_params["planet_id"], "Planet")
+
+
+@conditional("character", "favorite")
+async def get_top_people(request, session):
+    return await leaderboard(request, session, Character)
+
+
+@conditional("planet", "favorite")
+async def get_top_planets(request, session):
+    return await leaderboard(request, session, Planet)
+
+
+async def leaderboard(request, session, model):
+    rows = await session.execute(top_statement(model, leaderboard_limit(request.query_params)))
+    return json_response(top_rows(model, rows))
+
+
+@conditional("character", "post")
+async def get_person_posts(request, session):
+    return await child_listing(request, session, Post, "character_id", request.path_params["character_id"], Character, "Character")
+
+
+@conditional("character", "media")
+async def get_person_media(request, session):
+    return await child_listing(request, session, Media, "character_id", request.path_params["character_id"], Character, "Character")
+
+
+@conditional("planet", "post")
+async def get_planet_posts(request, session):
+    return await child_listing(request, session, Post, "planet_id", request.path_params["planet_id"], Planet, "Planet")
+
+
+@conditional("planet", "media")
+async def get_planet_media(request, session):
+    return await child_listing(request, session, Media, "planet_id", request.path_params["planet_id"], Planet, "Planet")
+
+
+async def child_listing(request, session, model, field, owner_id, owner, label):
+    serialize = serializer_for(model, get_fields(model, request.query_params))
+    stmt, limit = child_statement(model, serialize, field, owner_id, request.query_params)
+    items, next_cursor = split_page(serialize, (await session.execute(stmt)).all(), limit)
+    if not items and await session.get(owner, owner_id) is None:
+        return json_response({"error": f"{label} not found"}, status_code=404)
+    return await page_response(request, session, model, items, next_cursor)
+
+
+@conditional("character", "planet")
+async def search_entities(request, session):
+    kinds = search_kinds(request.query_params)
+    unknown = [kind for kind in kinds if kind not in SEARCH_MODELS]
+    if unknown or not kinds:
+        return json_response({"error": "Unknown type: " + ", ".join(unknown), "allowed": list(SEARCH_MODELS)}, status_code=400)
+
+    limit, offset = search_page_args(request.query_params)
+    q = search_terms(request.query_params.get("q"))
+    hits = (await session.execute(hits_statement(session.bind.dialect.name, q, kinds, limit, offset))).all()
+    rows = {}
+    for kind, serialize, stmt in entity_statements(kinds, hits[:limit]):
+        rows.update(((kind, row.ID), serialize(row)) for row in await session.execute(stmt))
+    results, next_offset = search_results(hits, rows, limit, offset)
+    return await page_response(request, session, None, results, next_offset)
+
+
+@conditional("user")
+async def get_all_users(request, session):
+    return await list_page(request, session, User)
+
+
+FAVORITE_EXPANDS = {"planet": (Planet, "planet_id"), "character": (Character, "character_id")}
+
+
+@conditional("favorite", depends=expanded_tables)
+async def get_all_favorites_from_user(request, session):
+    user_id = _int(request.query_params.get("user_id"))
+    if not user_id:
+        return json_response({"error": "user_id is required"}, status_code=400)
+    expand = favorite_expands(request.query_params)
+    unknown = [name for name in expand if name not in FAVORITE_EXPANDS]
+    if unknown:
+        return json_response({"error": "Unknown expand: " + ", ".join(unknown), "allowed": list(FAVORITE_EXPANDS)}, status_code=400)
+
+    serialize = serializer_for(Favorite)
+    rows = (await session.execute(
+        select(*serialize.columns).where(Favorite.user_id == user_id).order_by(Favorite.ID))).all()
+    if not rows:
+        return json_response({"error": "There are no favorites for this user"}, status_code=404)
+    favorites = serialize.many(rows)
+
+    # One IN query per expanded relationship, however many favorites there are
+    for name in expand:
+        model, field = FAVORITE_EXPANDS[name]
+        ids = {favorite[field] for favorite in favorites if favorite[field] is not None}
+        related = {}
+        if ids:
+            related_serializer = serializer_for(model)
+            result = await session.execute(select(*related_serializer.columns).where(model.ID.in_(ids)))
+            related = {row.ID: related_serializer(row) for row in result}
+        for favorite in favorites:
+            favorite[name] = related.get(favorite[field])
+    return json_response(favorites)
+
+
+@conditional("follower", "user")
+async def get_followers(request, session):
+    return await user_page(request, session, partial(follow_statement, user_id=request.path_params["user_id"], direction="followers"))
+
+
+@conditional("follower", "user")
+async def get_following(request, session):
+    return await user_page(request, session, partial(follow_statement, user_id=request.path_params["user_id"], direction="following"))
+
+
+@conditional("follower", "user")
+async def get_mutuals(request, session):
+    return await user_page(request, session, partial(mutual_statement, user_id=request.path_params["user_id"]))
+
+
+async def user_page(request, session, statement):
+    serialize = serializer_for(User, get_fields(User, request.query_params))
+    stmt, limit = statement(serialize, args=request.query_params)
+    items, next_cursor = split_page(serialize, (await session.execute(stmt)).all(), limit)
+    return await page_response(request, session, User, items, next_cursor)
+
+
+@conditional("follower")
+async def get_relationship(request, session):
+    user_id, other_id = request.path_params["user_id"], request.path_params["other_id"]
+    rows = await session.execute(relationship_statement(user_id, other_id))
+    return json_response(relationship(user_id, other_id, rows))
+
+
+@conditional("follower", "user")
+async def get_suggestions(request, session):
+    stmt = suggestions_statement(request.path_params["user_id"], suggestions_limit(request.query_params))
+    return json_response(suggestion_rows(await session.execute(stmt)))
+
+
+@conditional("post", "follower")
+async def get_feed(request, session):
+    user_id = _int(request.query_params.get("user_id"))
+    if not user_id:
+        return json_response({"error": "user_id is required"}, status_code=400)
+    stmt, limit = feed_statement(flask_app.config["FEED_STRATEGY"], session.bind.dialect.name, user_id, request.query_params)
+    posts, next_cursor = split_feed((await session.execute(stmt)).all(), limit)
+    return await page_response(request, session, Post, posts, next_cursor)
+
+
+async def handle_api_exception(request, error):
+    return json_response(error.to_dict(), status_code=error.status_code)
+
+
+def metrics_endpoint(scope):
+    """The Flask endpoint name of the async handler that served the request, the labels of /metrics."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None or endpoint is wsgi_application:
+        return None
+    return f"{api.name}.{endpoint.__name__}"
+
+
+routes_application = Starlette(
+    routes=[
+        Route(api.url_prefix + "/people", get_all_people),
+        Route(api.url_prefix + "/people/{character_id:int}", get_single_person),
+        Route(api.url_prefix + "/people/top", get_top_people),
+        Route(api.url_prefix + "/people/{character_id:int}/posts", get_person_posts),
+        Route(api.url_prefix + "/people/{character_id:int}/media", get_person_media),
+        Route(api.url_prefix + "/planets", get_all_planets),
+        Route(api.url_prefix + "/planets/{planet_id:int}", get_single_planet),
+        Route(api.url_prefix + "/planets/top", get_top_planets),
+        Route(api.url_prefix + "/planets/{planet_id:int}/posts", get_planet_posts),
+        Route(api.url_prefix + "/planets/{planet_id:int}/media", get_planet_media),
+        Route(api.url_prefix + "/search", search_entities),
+        Route(api.url_prefix + "/users", get_all_users),
+        Route(api.url_prefix + "/users/favorites", get_all_favorites_from_user),
+        Route(api.url_prefix + "/users/{user_id:int}/followers", get_followers),
+        Route(api.url_prefix + "/users/{user_id:int}/following", get_following),
+        Route(api.url_prefix + "/users/{user_id:int}/mutuals", get_mutuals),
+        Route(api.url_prefix + "/users/{user_id:int}/relationship/{other_id:int}", get_relationship),
+        Route(api.url_prefix + "/users/{user_id:int}/suggestions", get_suggestions),
+        Route(api.url_prefix + "/feed", get_feed),
+        Mount("/", app=wsgi_application),
+    ],
+    exception_handlers={APIException: handle_api_exception},
+    middleware=[Middleware(AsgiMetricsMiddleware, endpoint_name=metrics_endpoint)],
+)
+
+
+def wants_stream(scope):
+    query = QueryParams(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("stream") == "1" or "application/x-ndjson" in Headers(scope=scope).get("accept", "")
+
+
+async def application(scope, receive, send):
+    # NDJSON streaming stays on the Flask generator path
+    if scope["type"] == "http" and wants_stream(scope):
+        await wsgi_application(scope, receive, send)
+    else:
+        await routes_application(scope, receive, send)
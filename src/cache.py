@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select
+from models import db, Character, Planet
+from serializers import json_body, serializer_for
+from versioning import table_version
+
+CACHED_MODELS = (Character, Planet)
+
+
+class LocalCache:
+    """Bounded per-process LRU with a TTL on every entry."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """
+    Shared backend so every worker sees the same invalidations.
+    Any Redis compatible server works, e.g. a local `redis-server` for development.
+    """
+
+    def __init__(self, url, ttl=300):
+        import redis
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value):
+        self._client.set(key, value, ex=self.ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def clear(self):
+        keys = list(self._client.scan_iter("entity:*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+entity_cache = LocalCache()
+
+
+def setup_cache(app):
+    global entity_cache
+    ttl = int(os.getenv("ENTITY_CACHE_TTL", 300))
+    url = os.getenv("ENTITY_CACHE_URL")
+    if url:
+        entity_cache = RedisCache(url, ttl=ttl)
+    else:
+        entity_cache = LocalCache(maxsize=int(os.getenv("ENTITY_CACHE_SIZE", 1024)), ttl=ttl)
+
+
+def cache_key(model, entity_id, version):
+    # Every write bumps the table version, so entries cached before it are never
+    # read again, in any worker, and age out of the LRU / TTL on their own
+    return f"entity:{model.__tablename__}:{version}:{entity_id}"
+
+
+def get_cached_entity(model, entity_id):
+    """
+    Returns the JSON bytes for one row of `model`, reading the database only
+    on a cache miss. Returns None when the row does not exist.
+    """
+    key = cache_key(model, entity_id, table_version(model.__tablename__))
+    body = entity_cache.get(key)
+    if body is not None:
+        return body
+
+    serialize = serializer_for(model)
+    row = db.session.execute(select(*serialize.columns).where(model.ID == entity_id)).first()
+    if row is None:
+        return None
+    body = json_body(serialize(row))
+    entity_cache.set(key, body)
+    return body
@@ -0,0 +1,184 @@
+import re
+import sys
+from contextlib import contextmanager
+import click
+from sqlalchemy import event, text
+from models import db
+from counters import recount_favorites
+from feed import rebuild_timelines
+from search import rebuild_search_index
+from snapshot import CatalogSnapshot
+from versioning import bump_versions
+
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+# Write routes run in this order, so the deletes find what the inserts wrote
+WRITE_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
+# Request bodies for write routes that need more than {"user_id": sample_id}
+WRITE_BODIES = {
+    "api.add_favorites_batch": lambda sample_id: {"items": [{"planet_id": sample_id}, {"character_id": sample_id}]},
+    "api.delete_favorites_batch": lambda sample_id: {"items": [{"planet_id": sample_id}, {"character_id": sample_id}]},
+    "api.create_post": lambda sample_id: {"description": "explain-queries", "planet_id": sample_id},
+    # A user can't follow themselves
+    "api.follow_user": lambda sample_id: {"user_id": sample_id + 1},
+    "api.unfollow_user": lambda sample_id: {"user_id": sample_id + 1},
+}
+
+
+def setup_commands(app):
+
+    @app.cli.command("explain-queries")
+    @click.option("--max-rows", default=10000, show_default=True,
+                  help="Fail when a full scan hits a table with more rows than this.")
+    @click.option("--sample-id", default=1, show_default=True,
+                  help="Value used for <int:...> path arguments and user_id (the follower is sample-id + 1).")
+    @click.option("--url", "extra_urls", multiple=True, help="Extra URL to exercise, can be repeated.")
+    def explain_queries(max_rows, sample_id, extra_urls):
+        """
+        Runs EXPLAIN on every query the api routes emit and fails on large full
+        scans. The write routes run in a transaction that is rolled back.
+        """
+        statements = capture_statements(app, api_urls(app, sample_id) + list(extra_urls), write_requests(app, sample_id))
+        failures = 0
+        with app.app_context(), db.engine.connect() as connection:
+            for statement, parameters in statements:
+                for table in scanned_tables(connection, statement, parameters):
+                    rows = table_rows(connection, table)
+                    flag = "FAIL" if rows > max_rows else "ok"
+                    failures += flag == "FAIL"
+                    click.echo(f"[{flag}] full scan on {table} ({rows} rows): {' '.join(statement.split())[:160]}")
+        click.echo(f"{len(statements)} statements explained, {failures} over the {max_rows} row limit")
+        if failures:
+            sys.exit(1)
+
+    @app.cli.command("recount-favorites")
+    def recount_favorites_command():
+        """Rebuilds favorite_count on planets and characters from the favorite table."""
+        with db.engine.begin() as connection:
+            recount_favorites(connection)
+            bump_versions(connection, ["planet", "character"])
+        click.echo("favorite counts rebuilt")
+
+    @app.cli.command("rebuild-timelines")
+    def rebuild_timelines_command():
+        """Refills the timeline table used by FEED_STRATEGY=write from follower and post."""
+        with db.engine.begin() as connection:
+            rebuild_timelines(connection)
+        click.echo("timelines rebuilt")
+
+    @app.cli.command("rebuild-search")
+    def rebuild_search_command():
+        """Refills the SQLite FTS5 search tables from characters and planets."""
+        with db.engine.begin() as connection:
+            rebuild_search_index(connection)
+        click.echo("search index rebuilt")
+
+    @app.cli.command("catalog-snapshot-report")
+    def catalog_snapshot_report():
+        """Loads the CATALOG_SNAPSHOT tables once and prints what they cost in memory."""
+        snapshot = CatalogSnapshot(app, poll_seconds=0)
+        with app.app_context():
+            snapshot.refresh()
+        for name, report in snapshot.memory_report().items():
+            click.echo(f"{name}: {report['rows']} rows, {report['bytes'] / 1024 / 1024:.1f} MiB, "
+                       f"{report['bytes_per_row']} bytes per row")
+
+
+def api_urls(app, sample_id):
+    urls = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith("api.") or "GET" not in rule.methods:
+            continue
+        url = re.sub(r"<(?:int:)?\w+>", str(sample_id), rule.rule)
+        urls += [f"{url}?user_id={sample_id}", f"{url}?user_id={sample_id}&after={sample_id}"]
+    return urls
+
+
+def write_requests(app, sample_id):
+    """(method, url, body) for every write route of the api blueprint."""
+    requests = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith("api."):
+            continue
+        url = re.sub(r"<(?:int:)?\w+>", str(sample_id), rule.rule)
+        body = {"user_id": sample_id}
+        body.update(WRITE_BODIES.get(rule.endpoint, lambda _: {})(sample_id))
+        requests += [(method, url, body) for method in rule.methods if method in WRITE_METHODS]
+    return sorted(requests, key=lambda request: (WRITE_METHODS.index(request[0]), request[1]))
+
+
+def capture_statements(app, urls, writes=()):
+    seen = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if EXPLAINABLE.match(statement):
+            # An executemany is explained with its first row
+            seen.setdefault(statement, parameters[0] if executemany else parameters)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client = app.test_client()
+        for url in urls:
+            client.get(url)
+        # The requests reuse a pushed app context and its session: push one whose session is made in the transaction
+        with engine.connect() as connection, rolled_back_session(connection), app.app_context():
+            for method, url, body in writes:
+                client.open(url, method=method, json=body)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return list(seen.items())
+
+
+@contextmanager
+def rolled_back_session(connection):
+    """
+    Runs db.session in a transaction of `connection` that is rolled back on
+    exit. The commits of the routes only release savepoints inside it.
+    """
+    transaction = connection.begin()
+    if connection.dialect.name == "sqlite":
+        # pysqlite only sends BEGIN before DML: the first SAVEPOINT would open, and its RELEASE commit, a transaction
+        connection.exec_driver_sql("BEGIN")
+    factory = db.session.session_factory
+    options = dict(factory.kw)
+    factory.configure(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield
+    finally:
+        factory.kw = options
+        transaction.rollback()
+
+
+def scanned_tables(connection, statement, parameters):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        return set(_pg_seq_scans(plan[0]["Plan"]))
+    if dialect == "sqlite":
+        details = [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        # An unfiltered scan read in index order stops after LIMIT rows, so it is bounded.
+        # With a WHERE it may read the whole table to find them, so it still counts.
+        upper = statement.upper()
+        if " LIMIT " in upper and " WHERE " not in upper and not any("TEMP B-TREE" in detail for detail in details):
+            return set()
+        matches = [re.match(r"SCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)", detail) for detail in details]
+        return {match.group(1) for match in matches if match and match.group(1) in db.metadata.tables}
+    return set()
+
+
+def _pg_seq_scans(node):
+    if node.get("Node Type") == "Seq Scan":
+        yield node["Relation Name"]
+    for child in node.get("Plans", ()):
+        yield from _pg_seq_scans(child)
+
+
+def table_rows(connection, table):
+    if connection.dialect.name == "postgresql":
+        estimate = connection.execute(text("SELECT reltuples FROM pg_class WHERE relname = :table"),
+                                      {"table": table}).scalar()
+        # reltuples is -1 (0 before PostgreSQL 14) until the table is first analyzed: count it instead
+        if estimate is not None and estimate > 0:
+            return int(estimate)
+    return connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar()
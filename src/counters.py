@@ -0,0 +1,71 @@
+"""
+favorite_count on Planet and Character, so the /top leaderboards walk an
+index instead of grouping the whole favorite table.
+
+The favorite routes write with Core statements and call
+adjust_favorite_counts() with the rows they actually inserted or deleted, in
+the same transaction. Favorites written through the ORM (the admin) are
+counted by the mapper events below. recount_favorites() rebuilds every counter
+from the favorite table, after bulk loads or to repair drift.
+"""
+from collections import Counter
+from sqlalchemy import bindparam, event, func, select, update
+from models import db, Character, Favorite, Planet
+from serializers import serializer_for
+
+COUNTED_MODELS = {"planet_id": Planet, "character_id": Character}
+
+
+def favorite_keys(rows):
+    """(field, id) of the target of every favorite row or object."""
+    return [(field, getattr(row, field)) for row in rows for field in COUNTED_MODELS if getattr(row, field) is not None]
+
+
+def adjust_favorite_counts(connection, keys, delta):
+    """Adds `delta` to the counter of every (field, id) in `keys`, one executemany per table."""
+    for field, model in COUNTED_MODELS.items():
+        counts = Counter(target_id for key_field, target_id in keys if key_field == field)
+        if not counts:
+            continue
+        table = model.__table__
+        # Sorted so concurrent transactions lock the rows in the same order
+        connection.execute(
+            update(table).where(table.c.ID == bindparam("target_id"))
+            .values(favorite_count=table.c.favorite_count + bindparam("delta")),
+            [{"target_id": target_id, "delta": count * delta} for target_id, count in sorted(counts.items())])
+
+
+def top_favorited(model, limit):
+    """The `limit` most favorited rows, read backwards from the (favorite_count, ID) index."""
+    return top_rows(model, db.session.execute(top_statement(model, limit)))
+
+
+# Statement and rows halves of top_favorited(), asgi.py runs the statement on its own session
+def top_statement(model, limit):
+    return (select(*serializer_for(model).columns, model.favorite_count)
+            .where(model.favorite_count > 0)
+            .order_by(model.favorite_count.desc(), model.ID.desc())
+            .limit(limit))
+
+
+def top_rows(model, rows):
+    serialize = serializer_for(model)
+    return [dict(serialize(row), favorite_count=row.favorite_count) for row in rows]
+
+
+def recount_favorites(connection):
+    favorite = Favorite.__table__
+    for field, model in COUNTED_MODELS.items():
+        table = model.__table__
+        counted = select(func.count()).select_from(favorite).where(favorite.c[field] == table.c.ID).scalar_subquery()
+        connection.execute(update(table).values(favorite_count=counted))
+
+
+@event.listens_for(Favorite, "after_insert")
+def _count_inserted_favorite(mapper, connection, favorite):
+    adjust_favorite_counts(connection, favorite_keys([favorite]), 1)
+
+
+@event.listens_for(Favorite, "after_delete")
+def _count_deleted_favorite(mapper, connection, favorite):
+    adjust_favorite_counts(connection, favorite_keys([favorite]), -1)
@@ -0,0 +1,145 @@
+"""
+The /feed timeline: posts of the accounts a user follows, newest first.
+
+FEED_STRATEGY picks how it is built:
+
+- "read" (default) merges the followees' posts at request time. On
+  PostgreSQL and MySQL a LATERAL subquery reads at most one page of each
+  followee's posts from ix_post_user_id_creation_date and only those are
+  merged, so the sort no longer grows with the followees' post counts. It
+  still does one index seek per followee: accounts following thousands of
+  others are better served by "write". Other databases (SQLite) join
+  follower to post and sort every followee post before the LIMIT.
+- "write" copies every new post into the timeline table of each follower
+  when it is created, so a page is one range scan on the reader's own
+  timeline rows however many accounts they follow.
+
+Timelines are written by the /posts and /follow routes through the functions
+below, and by the mapper events for posts written through the ORM (the admin).
+rebuild_timelines() fills the table from scratch after bulk loads or when
+switching a database to "write".
+"""
+from datetime import date
+from flask import current_app, request
+from sqlalchemy import delete, event, literal, select, true, tuple_
+from models import db, Follower, Post, Timeline
+from pagination import get_page_limit
+from serializers import serializer_for
+from utils import APIException, insert_ignore
+
+FEED_STRATEGIES = ("read", "write")
+# Posts of a newly followed account copied into the follower's timeline
+TIMELINE_BACKFILL = 100
+# Dialects that support LATERAL, the read strategy merges per followee pages there
+LATERAL_DIALECTS = ("postgresql", "mysql")
+
+
+def writes_timelines():
+    return current_app.config["FEED_STRATEGY"] == "write"
+
+
+def feed_cursor(row):
+    return f"{row.creation_date.isoformat()}_{row.ID}"
+
+
+def parse_feed_cursor(value):
+    """`after` is "<creation_date>_<ID>" of the last post of the previous page."""
+    try:
+        day, post_id = value.split("_")
+        return date.fromisoformat(day), int(post_id)
+    except ValueError:
+        raise APIException("after must be a cursor returned by a previous page", status_code=400)
+
+
+def feed_page(user_id):
+    """One page of the feed of `user_id`, returned as (posts, next_cursor)."""
+    stmt, limit = feed_statement(current_app.config["FEED_STRATEGY"], db.session.get_bind().dialect.name, user_id)
+    return split_feed(db.session.execute(stmt).all(), limit)
+
+
+def feed_statement(strategy, dialect, user_id, args=None):
+    """The statement of feed_page() under FEED_STRATEGY `strategy` and its limit."""
+    args = request.args if args is None else args
+    limit = get_page_limit(args)
+    after = args.get("after")
+    cursor = parse_feed_cursor(after) if after else None
+    serialize = serializer_for(Post)
+    if strategy == "write":
+        return timeline_statement(serialize, user_id, limit, cursor), limit
+    return followed_posts_statement(dialect, serialize, user_id, limit, cursor), limit
+
+
+def split_feed(rows, limit):
+    next_cursor = feed_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return serializer_for(Post).many(rows[:limit]), next_cursor
+
+
+def timeline_statement(serialize, user_id, limit, cursor):
+    stmt = (select(*serialize.columns).join(Timeline, Timeline.post_id == Post.ID)
+            .where(Timeline.user_id == user_id)
+            .order_by(Timeline.creation_date.desc(), Timeline.post_id.desc()))
+    if cursor:
+        stmt = stmt.where(tuple_(Timeline.creation_date, Timeline.post_id) < tuple_(*cursor))
+    return stmt.limit(limit + 1)
+
+
+def followed_posts_statement(dialect, serialize, user_id, limit, cursor):
+    """The next `limit` + 1 posts of the accounts `user_id` follows, for the read strategy."""
+    if dialect not in LATERAL_DIALECTS:
+        stmt = (select(*serialize.columns).join(Follower, Follower.user_to_id == Post.user_id)
+                .where(Follower.user_from_id == user_id)
+                .order_by(Post.creation_date.desc(), Post.ID.desc()))
+        if cursor:
+            stmt = stmt.where(tuple_(Post.creation_date, Post.ID) < tuple_(*cursor))
+        return stmt.limit(limit + 1)
+
+    # A page can't hold more than limit + 1 posts of one followee, read no more of each
+    latest = select(*serialize.columns).where(Post.user_id == Follower.user_to_id)
+    if cursor:
+        latest = latest.where(tuple_(Post.creation_date, Post.ID) < tuple_(*cursor))
+    latest = latest.order_by(Post.creation_date.desc(), Post.ID.desc()).limit(limit + 1).lateral("latest")
+    return (select(*latest.c).select_from(Follower).join(latest, true())
+            .where(Follower.user_from_id == user_id)
+            .order_by(latest.c.creation_date.desc(), latest.c.ID.desc()).limit(limit + 1))
+
+
+def fan_out_posts(connection, post_ids):
+    """Copies the posts into the timeline of every follower of their authors."""
+    connection.execute(insert_ignore(Timeline).from_select(
+        ["user_id", "creation_date", "post_id", "author_id"],
+        select(Follower.user_from_id, Post.creation_date, Post.ID, Post.user_id)
+        .join(Follower, Follower.user_to_id == Post.user_id)
+        .where(Post.ID.in_(post_ids))))
+
+
+def backfill_timeline(connection, user_id, author_id):
+    """Copies the latest TIMELINE_BACKFILL posts of `author_id` into the timeline of `user_id`."""
+    latest = (select(literal(user_id), Post.creation_date, Post.ID, Post.user_id)
+              .where(Post.user_id == author_id)
+              .order_by(Post.creation_date.desc(), Post.ID.desc()).limit(TIMELINE_BACKFILL))
+    connection.execute(insert_ignore(Timeline).from_select(
+        ["user_id", "creation_date", "post_id", "author_id"], latest))
+
+
+def prune_timeline(connection, user_id, author_id):
+    connection.execute(delete(Timeline).where(Timeline.user_id == user_id, Timeline.author_id == author_id))
+
+
+def rebuild_timelines(connection):
+    connection.execute(delete(Timeline))
+    connection.execute(insert_ignore(Timeline).from_select(
+        ["user_id", "creation_date", "post_id", "author_id"],
+        select(Follower.user_from_id, Post.creation_date, Post.ID, Post.user_id)
+        .join(Follower, Follower.user_to_id == Post.user_id)))
+
+
+@event.listens_for(Post, "after_insert")
+def _fan_out_inserted_post(mapper, connection, post):
+    if writes_timelines():
+        fan_out_posts(connection, [post.ID])
+
+
+@event.listens_for(Post, "before_delete")
+def _remove_deleted_post(mapper, connection, post):
+    # Whatever the strategy, rows left from an earlier "write" period would block the delete
+    connection.execute(delete(Timeline).where(Timeline.post_id == post.ID))
@@ -0,0 +1,156 @@
+"""
+Filtering and sorting for the /people and /planets listings:
+
+    ?faction=empire&age__gte=30&sort=-age
+
+A filter is `<field>=<value>` or `<field>__<op>=<value>`, with op one of
+eq, in (comma separated values), gt, gte, lt and lte. `sort` names one
+column, with a leading "-" for descending order; ID breaks ties. Enum fields
+take the member names (empire, hero...).
+
+Only the fields and operators in FILTERS and SORTS are accepted, and each
+of them must be the leading column of an index on its table (checked at
+import). Every accepted query is therefore an index range scan. A filter
+that would need a full scan, on name for example, is rejected with 400
+rather than answered slowly.
+
+Pages stay keyset paginated. With the default ID order `after` is the last
+ID as before. With another sort it is "<value>_<ID>" of the last row,
+taken from the Link / X-Next-Cursor headers.
+"""
+import operator
+from flask import request
+from sqlalchemy import Boolean, Float, Integer, select, tuple_
+from sqlalchemy import Enum as SQLAEnum
+from models import db, Character, Planet
+from pagination import MAX_INTEGER, get_fields, get_page_limit
+from serializers import serializer_for
+from utils import APIException
+
+RANGE = ("eq", "gt", "gte", "lt", "lte")
+FILTERS = {
+    Character: {"faction": ("eq", "in"), "type": ("eq", "in"), "age": RANGE},
+    Planet: {"inhabited": ("eq",), "size": RANGE, "distance": RANGE},
+}
+SORTS = {Character: ("ID", "age"), Planet: ("ID", "size", "distance")}
+OPERATORS = {
+    "eq": operator.eq, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le,
+    "in": lambda column, values: column.in_(values),
+}
+MAX_IN_VALUES = 50
+# Query arguments with their own meaning on the listings
+RESERVED_ARGS = {"limit", "after", "fields", "sort", "stream", "include", "user_id"}
+
+
+def _check_indexed(model):
+    leading = {list(index.columns)[0].name for index in model.__table__.indexes} | {"ID"}
+    for field in [*FILTERS[model], *SORTS[model]]:
+        if field not in leading:
+            raise RuntimeError(f"{model.__name__}.{field} is filterable but leads no index, it would need a full scan")
+
+
+for _model in FILTERS:
+    _check_indexed(_model)
+
+
+def parse_value(model, field, raw):
+    column_type = getattr(model, field).type
+    try:
+        if isinstance(column_type, SQLAEnum):
+            return column_type.enum_class[raw]
+        if isinstance(column_type, Boolean):
+            return {"true": True, "1": True, "false": False, "0": False}[raw.lower()]
+        if isinstance(column_type, Integer):
+            value = int(raw)
+            if abs(value) > MAX_INTEGER:
+                raise ValueError(raw)
+            return value
+        if isinstance(column_type, Float):
+            return float(raw)
+        return raw
+    except (KeyError, ValueError):
+        payload = {"allowed": list(column_type.enum_class.__members__)} if isinstance(column_type, SQLAEnum) else None
+        raise APIException(f"Invalid value for {field}: {raw!r}", status_code=400, payload=payload)
+
+
+def filter_criteria(model, args=None):
+    """The WHERE clauses for the filters in the query string, rejecting anything not in FILTERS."""
+    args = request.args if args is None else args
+    allowed = FILTERS[model]
+    criteria = []
+    # Flask's MultiDict or Starlette's QueryParams
+    items = args.multi_items() if hasattr(args, "multi_items") else args.items(multi=True)
+    for key, raw in items:
+        if key in RESERVED_ARGS:
+            continue
+        field, _, op = key.partition("__")
+        op = op or "eq"
+        if field not in allowed or op not in allowed[field]:
+            raise APIException(f"Unsupported filter: {key}", status_code=400,
+                               payload={"allowed": {name: list(ops) for name, ops in allowed.items()}})
+        column = getattr(model, field)
+        if op == "in":
+            values = [value for value in raw.split(",") if value]
+            if not 0 < len(values) <= MAX_IN_VALUES:
+                raise APIException(f"{key} takes 1 to {MAX_IN_VALUES} values", status_code=400)
+            criteria.append(OPERATORS[op](column, [parse_value(model, field, value) for value in values]))
+        else:
+            criteria.append(OPERATORS[op](column, parse_value(model, field, raw)))
+    return criteria
+
+
+def sort_order(model, args=None):
+    """(field, descending) from `sort`, ID ascending by default."""
+    sort = (request.args if args is None else args).get("sort") or "ID"
+    field = sort.removeprefix("-")
+    if field not in SORTS[model]:
+        raise APIException(f"Unsupported sort: {sort}", status_code=400, payload={"allowed": list(SORTS[model])})
+    return field, sort.startswith("-")
+
+
+def parse_cursor(model, field, raw):
+    if field == "ID":
+        return parse_value(model, "ID", raw)
+    value, _, last_id = raw.rpartition("_")
+    if not value:
+        raise APIException("after must be a cursor returned by a previous page", status_code=400)
+    return parse_value(model, field, value), parse_value(model, "ID", last_id)
+
+
+def listing_statement(model, serialize, args=None):
+    """
+    One filtered, sorted keyset page of `model` with `serialize.columns`.
+    Returns (statement, limit, sort_field); the rows also carry `sort_value`.
+    """
+    args = request.args if args is None else args
+    limit = get_page_limit(args)
+    field, descending = sort_order(model, args)
+    column = getattr(model, field)
+    stmt = select(*serialize.columns, column.label("sort_value")).where(*filter_criteria(model, args))
+    if field == "ID":
+        order, position = [column], column
+    else:
+        order, position = [column, model.ID], tuple_(column, model.ID)
+    after = args.get("after")
+    if after:
+        cursor = parse_cursor(model, field, after)
+        cursor = cursor if field == "ID" else tuple_(*cursor)
+        stmt = stmt.where(position < cursor if descending else position > cursor)
+    order = [part.desc() for part in order] if descending else order
+    return stmt.order_by(*order).limit(limit + 1), limit, field
+
+
+def split_listing(serialize, rows, limit, field):
+    """Like pagination.split_page, with a "<value>_<ID>" cursor when sorted by another column."""
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = last.ID if field == "ID" else f"{last.sort_value}_{last.ID}"
+    return serialize.many(rows[:limit]), next_cursor
+
+
+def filtered_page(model):
+    """keyset_page() with the filters and sort of the query string."""
+    serialize = serializer_for(model, get_fields(model))
+    stmt, limit, field = listing_statement(model, serialize)
+    return split_listing(serialize, db.session.execute(stmt).all(), limit, field)
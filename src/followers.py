@@ -0,0 +1,111 @@
+"""
+Queries over the follower graph. Every one is driven by one of the two
+composite indexes on follower, (user_from_id, user_to_id) for "who does X
+follow" and (user_to_id, user_from_id) for "who follows X", so a page costs
+one index range scan plus primary key lookups on user, however many
+followers the user has.
+
+Each query is built by a *_statement() function, so the async handlers in
+asgi.py can run it on their own session.
+"""
+from sqlalchemy import and_, exists, func, select
+from sqlalchemy.orm import aliased
+from models import db, Follower, User
+from pagination import get_fields, get_page_args, split_page
+from serializers import serializer_for
+
+# Suggestions look at this many of the user's followees and this many of their follow edges
+SUGGESTION_FANOUT = 200
+SUGGESTION_SCAN = 10000
+
+DIRECTIONS = {
+    # direction: (column matching the user, column of the listed users)
+    "followers": (Follower.user_to_id, Follower.user_from_id),
+    "following": (Follower.user_from_id, Follower.user_to_id),
+}
+
+
+def follow_page(user_id, direction):
+    """One keyset page of the users following `user_id` or followed by it, ordered by their ID."""
+    serialize = serializer_for(User, get_fields(User))
+    stmt, limit = follow_statement(serialize, user_id, direction)
+    return split_page(serialize, db.session.execute(stmt).all(), limit)
+
+
+def follow_statement(serialize, user_id, direction, args=None):
+    """The statement of follow_page() and its limit."""
+    limit, after = get_page_args(args)
+    own, other = DIRECTIONS[direction]
+    stmt = (select(*serialize.columns).join(Follower, other == User.ID)
+            .where(own == user_id).order_by(other).limit(limit + 1))
+    if after is not None:
+        stmt = stmt.where(other > after)
+    return stmt, limit
+
+
+def mutual_page(user_id):
+    """Users that `user_id` follows and who follow it back, one keyset page."""
+    serialize = serializer_for(User, get_fields(User))
+    stmt, limit = mutual_statement(serialize, user_id)
+    return split_page(serialize, db.session.execute(stmt).all(), limit)
+
+
+def mutual_statement(serialize, user_id, args=None):
+    """The statement of mutual_page() and its limit."""
+    limit, after = get_page_args(args)
+    back = aliased(Follower)
+    stmt = (select(*serialize.columns)
+            .join(Follower, Follower.user_to_id == User.ID)
+            .join(back, and_(back.user_from_id == Follower.user_to_id, back.user_to_id == Follower.user_from_id))
+            .where(Follower.user_from_id == user_id).order_by(Follower.user_to_id).limit(limit + 1))
+    if after is not None:
+        stmt = stmt.where(Follower.user_to_id > after)
+    return stmt, limit
+
+
+def relationship_between(user_id, other_id):
+    """Whether each user follows the other, from one primary key probe per direction."""
+    return relationship(user_id, other_id, db.session.execute(relationship_statement(user_id, other_id)))
+
+
+def relationship_statement(user_id, other_id):
+    return select(Follower.user_from_id, Follower.user_to_id).where(
+        ((Follower.user_from_id == user_id) & (Follower.user_to_id == other_id))
+        | ((Follower.user_from_id == other_id) & (Follower.user_to_id == user_id)))
+
+
+def relationship(user_id, other_id, rows):
+    pairs = {(row.user_from_id, row.user_to_id) for row in rows}
+    follows, followed_by = (user_id, other_id) in pairs, (other_id, user_id) in pairs
+    return {"user_id": user_id, "other_id": other_id, "follows": follows, "followed_by": followed_by,
+            "mutual": follows and followed_by}
+
+
+def suggestions(user_id, limit):
+    """
+    Users followed by the people `user_id` follows, ranked by how many of them
+    do. Both hops are capped (SUGGESTION_FANOUT, SUGGESTION_SCAN) so users
+    with huge graphs cost the same as everyone else.
+    """
+    return suggestion_rows(db.session.execute(suggestions_statement(user_id, limit)))
+
+
+def suggestions_statement(user_id, limit):
+    hop = aliased(Follower)
+    already = aliased(Follower)
+    followees = (select(Follower.user_to_id.label("ID")).where(Follower.user_from_id == user_id)
+                 .order_by(Follower.user_to_id).limit(SUGGESTION_FANOUT).subquery())
+    candidates = (select(hop.user_to_id.label("ID")).join(followees, hop.user_from_id == followees.c.ID)
+                  .limit(SUGGESTION_SCAN).subquery())
+    score = func.count().label("score")
+    ranked = (select(candidates.c.ID, score)
+              .where(candidates.c.ID != user_id,
+                     ~exists().where(already.user_from_id == user_id, already.user_to_id == candidates.c.ID))
+              .group_by(candidates.c.ID).order_by(score.desc(), candidates.c.ID).limit(limit).subquery())
+    return (select(*serializer_for(User).columns, ranked.c.score).join(ranked, ranked.c.ID == User.ID)
+            .order_by(ranked.c.score.desc(), User.ID))
+
+
+def suggestion_rows(rows):
+    serialize = serializer_for(User)
+    return [dict(serialize(row), score=row.score) for row in rows]
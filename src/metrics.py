@@ -0,0 +1,229 @@
+"""
+Per-endpoint request metrics in Prometheus text format at GET /metrics.
+
+MetricsMiddleware wraps app.wsgi_app and records, for every request, the
+latency until the last byte of the body is sent (streamed responses
+included), the request and response sizes, and the number and total time of
+the SQL statements executed while serving it. AsgiMetricsMiddleware records
+the same series for the async handlers of asgi.py: the statements of the
+async engines go through the same Engine events. Numbers are kept per worker
+process, like /internal/pool.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils import is_internal_request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = Histogram("http_request_duration_seconds", "Time until the last response byte was sent.", LATENCY_BUCKETS)
+        self.request_size = Histogram("http_request_size_bytes", "Request body size.", SIZE_BUCKETS)
+        self.response_size = Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS)
+        self.db_queries = Histogram("http_request_db_queries", "SQL statements executed per request.", QUERY_BUCKETS)
+        self.db_time = Histogram("http_request_db_seconds", "Time spent executing SQL per request.", LATENCY_BUCKETS)
+
+    def record(self, method, endpoint, status, seconds, request_bytes, response_bytes, queries, query_seconds):
+        labels = (("endpoint", endpoint), ("method", method))
+        with self._lock:
+            key = labels + (("status", status),)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, seconds)
+            self.request_size.observe(labels, request_bytes)
+            self.response_size.observe(labels, response_bytes)
+            self.db_queries.observe(labels, queries)
+            self.db_time.observe(labels, query_seconds)
+
+    def render(self):
+        lines = ["# HELP http_requests_total Requests served.", "# TYPE http_requests_total counter"]
+        with self._lock:
+            for labels, count in sorted(self.requests.items()):
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                lines.append(f"http_requests_total{{{label_text}}} {count}")
+            for histogram in (self.latency, self.request_size, self.response_size, self.db_queries, self.db_time):
+                lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class _Tracked:
+    __slots__ = ("endpoint", "queries", "query_seconds", "query_started")
+
+    def __init__(self):
+        self.endpoint = "unmatched"
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.query_started = None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracked = _current.get()
+    if tracked is not None:
+        tracked.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracked = _current.get()
+    if tracked is not None and tracked.query_started is not None:
+        tracked.queries += 1
+        tracked.query_seconds += time.perf_counter() - tracked.query_started
+        tracked.query_started = None
+
+
+class _MeteredBody:
+    """Response iterable that records the request once the server closes it."""
+
+    def __init__(self, body, environ, tracked, start, status):
+        self.body = body
+        self.environ = environ
+        self.tracked = tracked
+        self.start = start
+        self.status = status
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self.body:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            try:
+                request_bytes = int(self.environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                request_bytes = 0
+            tracked = self.tracked
+            request_metrics.record(self.environ.get("REQUEST_METHOD", "GET"), tracked.endpoint,
+                                   self.status[0] if self.status else "500", time.perf_counter() - self.start,
+                                   request_bytes, self.sent, tracked.queries, tracked.query_seconds)
+            _current.set(None)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        tracked = _Tracked()
+        _current.set(tracked)
+        environ["metrics.tracked"] = tracked
+        status = []
+
+        def recording_start_response(status_line, headers, exc_info=None):
+            status[:] = [status_line.split(" ", 1)[0]]
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except Exception:
+            _current.set(None)
+            raise
+        return _MeteredBody(body, environ, tracked, start, status)
+
+
+class AsgiMetricsMiddleware:
+    """
+    MetricsMiddleware for a Starlette app. `endpoint_name(scope)` labels a
+    request from the endpoint the router put in its scope, or returns None for
+    the requests handed to the Flask app, which records them itself.
+    """
+
+    def __init__(self, app, endpoint_name):
+        self.app = app
+        self.endpoint_name = endpoint_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        tracked = _Tracked()
+        token = _current.set(tracked)
+        status, sent = [], [0]
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                status[:] = [str(message["status"])]
+            elif message["type"] == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            _current.reset(token)
+            endpoint = self.endpoint_name(scope)
+            if endpoint is not None:
+                try:
+                    request_bytes = int(dict(scope["headers"]).get(b"content-length") or 0)
+                except ValueError:
+                    request_bytes = 0
+                request_metrics.record(scope["method"], endpoint, status[0] if status else "500",
+                                       time.perf_counter() - start, request_bytes, sent[0],
+                                       tracked.queries, tracked.query_seconds)
+
+
+def setup_metrics(app):
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+
+    @app.before_request
+    def label_request_endpoint():
+        tracked = request.environ.get("metrics.tracked")
+        if tracked is not None and request.endpoint is not None:
+            tracked.endpoint = request.endpoint
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if not is_internal_request():
+            return jsonify({"error": "Forbidden"}), 403
+        return app.response_class(request_metrics.render(), mimetype=PROMETHEUS_MIMETYPE)
@@ -1,15 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, ForeignKey, Float, Integer, Date
+from typing import Optional
+from sqlalchemy import String, Boolean, ForeignKey, Float, Integer, Date, DateTime, Index, text
 from enum import Enum as PyEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone
 from sqlalchemy import Enum as SQLAEnum
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class User(db.Model):
     __tablename__ = "user"
+    PUBLIC_FIELDS = ("ID", "username", "firstname", "lastname", "email")
     ID: Mapped[int] = mapped_column(primary_key=True)
     username: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     password: Mapped[str] = mapped_column(String, nullable=False)
@@ -17,7 +20,8 @@ class User(db.Model):
     lastname: Mapped[str] = mapped_column(String)
     email: Mapped[str] = mapped_column(String, unique=True, nullable=False)
 
-    followers: Mapped[list["Follower"]] = relationship("Follower", back_populates="user")
+    followers: Mapped[list["Follower"]] = relationship("Follower", back_populates="user", foreign_keys="Follower.user_to_id")
+    following: Mapped[list["Follower"]] = relationship("Follower", back_populates="follower", foreign_keys="Follower.user_from_id")
     posts: Mapped[list["Post"]] = relationship("Post", back_populates="user")
     favorites: Mapped[list["Favorite"]] = relationship("Favorite", back_populates="user")
 
@@ -31,11 +35,17 @@ class User(db.Model):
         }
 
 class Follower(db.Model):
+    """user_from_id follows user_to_id."""
     __tablename__ = "follower"
-    user_from_id = Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), primary_key=True)
-    user_to_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), primary_key=True)
-
-    user: Mapped["User"] = relationship("User", back_populates="followers")
+    __table_args__ = (
+        # The primary key walks "who does X follow"; this one walks "who follows X"
+        Index("ix_follower_user_to_id", "user_to_id", "user_from_id"),
+    )
+    user_from_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), primary_key=True)
+    user_to_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), primary_key=True)
+
+    user: Mapped["User"] = relationship("User", back_populates="followers", foreign_keys=[user_to_id])
+    follower: Mapped["User"] = relationship("User", back_populates="following", foreign_keys=[user_from_id])
     
     def serialize(self):
         return {
@@ -48,13 +58,20 @@ class enumPost(PyEnum):
 
 class Post(db.Model):
     __tablename__ = "post"
+    __table_args__ = (
+        Index("ix_post_user_id_creation_date", "user_id", "creation_date", "ID"),
+        # With ID so the per-entity listings page in index order
+        Index("ix_post_planet_id", "planet_id", "ID"),
+        Index("ix_post_character_id", "character_id", "ID"),
+    )
+    PUBLIC_FIELDS = ("ID", "description", "type", "creation_date", "user_id", "planet_id", "character_id")
     ID: Mapped[int] = mapped_column(primary_key=True)
     description: Mapped[str] = mapped_column(String)
     type: Mapped[enumPost] = mapped_column(SQLAEnum(enumPost))
     creation_date: Mapped[datetime] = mapped_column(Date, default=lambda: datetime.now(timezone.utc), nullable=False)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
-    planet_id: Mapped[int] = mapped_column(Integer, ForeignKey("planet.id"))
-    character_id: Mapped[int] = mapped_column(Integer, ForeignKey("character.id"))
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), nullable=False)
+    planet_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("planet.ID"))
+    character_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("character.ID"))
 
     user: Mapped["User"] = relationship("User", back_populates="posts")
     character: Mapped["Character"] = relationship("Character", back_populates="posts")
@@ -73,10 +90,16 @@ class Post(db.Model):
     
 class Media(db.Model):
     __tablename__ = "media"
+    __table_args__ = (
+        # Cover the per-entity listings and the ?include=media prefetch
+        Index("ix_media_planet_id", "planet_id", "ID", postgresql_include=["url"]),
+        Index("ix_media_character_id", "character_id", "ID", postgresql_include=["url"]),
+    )
+    PUBLIC_FIELDS = ("ID", "url", "planet_id", "character_id")
     ID: Mapped[int] = mapped_column(primary_key=True)
     url: Mapped[str] = mapped_column(String, nullable=False)
-    planet_id: Mapped[int] = mapped_column(Integer, ForeignKey("planet.id"))
-    character_id: Mapped[int] = mapped_column(Integer, ForeignKey("character.id"))
+    planet_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("planet.ID"))
+    character_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("character.ID"))
     
     character: Mapped["Character"] = relationship("Character", back_populates="medias")
     planet: Mapped["Planet"] = relationship("Planet", back_populates="medias")
@@ -106,11 +129,21 @@ class enumRole(PyEnum):
 
 class Character(db.Model):
     __tablename__ = "character"
+    __table_args__ = (
+        Index("ix_character_favorite_count", "favorite_count", "ID"),
+        # Back the filters and sorts in filters.py
+        Index("ix_character_faction_age", "faction", "age", "ID"),
+        Index("ix_character_type_age", "type", "age", "ID"),
+        Index("ix_character_age", "age", "ID"),
+    )
+    PUBLIC_FIELDS = ("ID", "fullname", "age", "faction", "type")
     ID: Mapped[int] = mapped_column(primary_key=True)
     fullname: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     age: Mapped[int] = mapped_column(Integer, nullable=False)
     faction: Mapped[enumFaction] = mapped_column(SQLAEnum(enumFaction))
     type: Mapped[enumRole] = mapped_column(SQLAEnum(enumRole))
+    # Maintained by counters.py for the /people/top leaderboard
+    favorite_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     medias: Mapped[list["Media"]] = relationship("Media", back_populates="character")
     posts: Mapped[list["Post"]] = relationship("Post", back_populates="character")
@@ -127,11 +160,21 @@ class Character(db.Model):
     
 class Planet(db.Model):
     __tablename__ = "planet"
+    __table_args__ = (
+        Index("ix_planet_favorite_count", "favorite_count", "ID"),
+        # Back the filters and sorts in filters.py
+        Index("ix_planet_inhabited_size", "inhabited", "size", "ID"),
+        Index("ix_planet_size", "size", "ID"),
+        Index("ix_planet_distance", "distance", "ID"),
+    )
+    PUBLIC_FIELDS = ("ID", "name", "size", "inhabited", "distance")
     ID: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     size: Mapped[float] = mapped_column(Float, nullable=False)
     inhabited: Mapped[bool] = mapped_column(Boolean, nullable=False)
     distance: Mapped[float] = mapped_column(Float, nullable=False)
+    # Maintained by counters.py for the /planets/top leaderboard
+    favorite_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     medias: Mapped[list["Media"]] = relationship("Media", back_populates="planet")
     posts: Mapped[list["Post"]] = relationship("Post", back_populates="planet")
@@ -148,15 +191,57 @@ class Planet(db.Model):
     
 class Favorite(db.Model):
     __tablename__ = "favorite"
+    __table_args__ = (
+        Index("uq_favorite_user_planet", "user_id", "planet_id", unique=True,
+              postgresql_where=text("planet_id IS NOT NULL"), sqlite_where=text("planet_id IS NOT NULL")),
+        Index("uq_favorite_user_character", "user_id", "character_id", unique=True,
+              postgresql_where=text("character_id IS NOT NULL"), sqlite_where=text("character_id IS NOT NULL")),
+        # Covers the per-user listing: the partial indexes above cannot serve a plain user_id filter
+        Index("ix_favorite_user_id", "user_id", "ID", postgresql_include=["planet_id", "character_id"]),
+        Index("ix_favorite_planet_id", "planet_id"),
+        Index("ix_favorite_character_id", "character_id"),
+    )
+    PUBLIC_FIELDS = ("ID", "user_id", "planet_id", "character_id")
     ID: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
-    planet_id: Mapped[int] = mapped_column(Integer, ForeignKey("planet.id"))
-    character_id: Mapped[int] = mapped_column(Integer, ForeignKey("character.id"))
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), nullable=False)
+    planet_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("planet.ID"))
+    character_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("character.ID"))
 
     user: Mapped["User"] = relationship("User", back_populates="favorites")
     planet: Mapped["Planet"] = relationship("Planet", back_populates="favorites")
     character: Mapped["Character"] = relationship("Character", back_populates="favorites")
 
+    def serialize(self, expand=()):
+        data = {
+            "ID": self.ID,
+            "user_id": self.user_id,
+            "planet_id": self.planet_id,
+            "character_id": self.character_id,
+        }
+        # Only walk relationships the caller eager loaded, see FAVORITE_EXPANDS in routes
+        if "planet" in expand:
+            data["planet"] = self.planet.serialize() if self.planet else None
+        if "character" in expand:
+            data["character"] = self.character.serialize() if self.character else None
+        return data
+
+class Timeline(db.Model):
+    """Materialized feed for FEED_STRATEGY=write: one row per post of every account user_id follows."""
+    __tablename__ = "timeline"
+    __table_args__ = (
+        Index("ix_timeline_post_id", "post_id"),
+    )
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), primary_key=True)
+    creation_date: Mapped[datetime] = mapped_column(Date, primary_key=True)
+    post_id: Mapped[int] = mapped_column(Integer, ForeignKey("post.ID"), primary_key=True)
+    author_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.ID"), nullable=False)
+
+class TableVersion(db.Model):
+    __tablename__ = "table_version"
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
 
 
 
@@ -0,0 +1,92 @@
+from urllib.parse import urlencode
+from flask import request
+from sqlalchemy import select
+from utils import APIException
+from models import db
+from serializers import serializer_for
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+# Largest value a BIGINT holds, anything larger fails in the database
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def int_arg(args, name, default=None):
+    """The integer query arg `name`, `default` when it is absent; anything else is a 400."""
+    value = args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise APIException(f"{name} must be an integer", status_code=400)
+
+
+# `args` defaults to the Flask request's query string; the ASGI handlers pass their own
+def get_page_limit(args=None):
+    args = request.args if args is None else args
+    limit = int_arg(args, "limit", DEFAULT_PAGE_LIMIT)
+    if limit < 1:
+        raise APIException("limit must be a positive integer", status_code=400)
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def get_after(args=None):
+    """The `after` cursor of the listings ordered by integer ID."""
+    after = int_arg(request.args if args is None else args, "after")
+    if after is not None and not 0 <= after <= MAX_INTEGER:
+        raise APIException(f"after must be between 0 and {MAX_INTEGER}", status_code=400)
+    return after
+
+
+def get_page_args(args=None):
+    return get_page_limit(args), get_after(args)
+
+
+def get_fields(model, args=None):
+    # ID is always selected because it is the pagination cursor
+    fields = (request.args if args is None else args).get("fields")
+    if not fields:
+        return list(model.PUBLIC_FIELDS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.PUBLIC_FIELDS]
+    if unknown:
+        raise APIException("Unknown fields: " + ", ".join(unknown), status_code=400,
+                           payload={"allowed": list(model.PUBLIC_FIELDS)})
+    return ["ID"] + [field for field in requested if field != "ID"]
+
+
+def keyset_page(model):
+    """
+    Reads one page of `model` ordered by ID, starting after the `after` cursor.
+    Only the columns named in `fields` are selected, so no ORM objects are built
+    and every page costs one index range scan regardless of table size.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit, after = get_page_args()
+    serialize = serializer_for(model, get_fields(model))
+    rows = db.session.execute(page_statement(model, serialize, limit, after)).all()
+    return split_page(serialize, rows, limit)
+
+
+def page_statement(model, serialize, limit, after):
+    stmt = select(*serialize.columns).order_by(model.ID).limit(limit + 1)
+    if after is not None:
+        stmt = stmt.where(model.ID > after)
+    return stmt
+
+
+def split_page(serialize, rows, limit):
+    # One extra row was fetched to know whether a next page exists
+    next_cursor = rows[limit - 1].ID if len(rows) > limit else None
+    return serialize.many(rows[:limit]), next_cursor
+
+
+def page_headers(next_cursor, base_url=None, args=None):
+    if next_cursor is None:
+        return {}
+    args = dict(request.args.items() if args is None else args.items())
+    args["after"] = next_cursor
+    next_url = (request.base_url if base_url is None else base_url) + "?" + urlencode(args)
+    return {"Link": '<' + next_url + '>; rel="next"', "X-Next-Cursor": str(next_cursor)}
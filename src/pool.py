@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from uuid import uuid4
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from models import db
+from utils import is_internal_request
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_checkouts = 0
+
+    def record_wait(self, seconds, timed_out=False, overflow=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.overflow_checkouts += overflow
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "connects": self.connects,
+                "overflow_checkouts": self.overflow_checkouts,
+                "wait_ms_total": round(self.wait_total * 1000, 3),
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+                "wait_ms_avg": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited and whether it needed an overflow connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start, overflow=self.checkedout() > self.size())
+        return connection
+
+
+@event.listens_for(TimedQueuePool, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    with pool_stats._lock:
+        pool_stats.connects += 1
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def engine_options(database_uri):
+    """
+    Builds SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* environment variables.
+    DB_PGBOUNCER=1 turns off server-side prepared statements so the app can run
+    behind PgBouncer in transaction pooling mode.
+    """
+    url = make_url(database_uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+    }
+
+    if _env_flag("DB_PGBOUNCER", "false"):
+        driver = url.get_driver_name()
+        if driver == "psycopg":
+            options["connect_args"] = {"prepare_threshold": None}
+        elif driver == "asyncpg":
+            # asyncpg's statement cache and SQLAlchemy's own, and unique names so a
+            # statement prepared on one server connection never clashes on another
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0,
+                                       "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+        # psycopg2 never prepares statements server side, nothing to turn off
+    return options
+
+
+def pool_status():
+    pool = db.engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeout": pool.timeout(),
+        })
+    status.update(pool_stats.to_dict())
+    return status
+
+
+def setup_pool(app):
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    @app.route('/internal/pool', methods=['GET'])
+    def internal_pool():
+        if not is_internal_request():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify(pool_status()), 200
@@ -0,0 +1,151 @@
+"""
+Dev/test guard against N+1 query storms.
+
+With QUERY_BUDGET set, every request counts its SQL statements and fails
+(QUERY_BUDGET_MODE=raise) or logs a warning (the default) when it runs more
+than the budget, or when the same statement shape runs more than
+QUERY_REPEAT_LIMIT times, which is what a lazy relationship walked in a loop
+looks like. The warning carries the stack that issued the first repeat.
+Single views can set their own budget with @query_budget(n).
+
+QueryCounter is also usable on its own, see the assert_max_queries fixture in
+conftest.py.
+"""
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current = ContextVar("query_counter", default=None)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _app_frames(limit=10):
+    # Drop library frames (SQLAlchemy, Flask, ...) so the stack points at our code
+    frames = [frame for frame in traceback.extract_stack()[:-1]
+              if "site-packages" not in frame.filename and frame.filename != __file__]
+    return frames[-limit:]
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Records the statements executed while active, in this context only."""
+
+    def __init__(self, capture_stacks=True):
+        self.capture_stacks = capture_stacks
+        self.statements = []
+        self.shapes = Counter()
+        self.stacks = {}
+        self.seconds = 0.0
+        self._token = None
+        self._started = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, limit):
+        return {shape: count for shape, count in self.shapes.items() if count > limit}
+
+    def record(self, statement):
+        shape = _WHITESPACE.sub(" ", statement).strip()
+        self.statements.append(shape)
+        self.shapes[shape] += 1
+        if self.capture_stacks and self.shapes[shape] == 2:
+            self.stacks[shape] = "".join(traceback.format_list(_app_frames()))
+
+    def report(self, repeat_limit=1):
+        lines = [f"{self.count} statements in {self.seconds * 1000:.1f} ms"]
+        for shape, count in sorted(self.repeated(repeat_limit).items(), key=lambda item: -item[1]):
+            lines.append(f"  {count}x {shape[:200]}")
+            if shape in self.stacks:
+                lines.append("  first repeated at:\n" + self.stacks[shape])
+        return "\n".join(lines)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self._token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter._started = time.perf_counter()
+        counter.record(statement)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None and counter._started is not None:
+        counter.seconds += time.perf_counter() - counter._started
+        counter._started = None
+
+
+def query_budget(limit):
+    """Overrides QUERY_BUDGET for one view."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def check_budget(counter, budget, repeat_limit, label):
+    problems = []
+    if counter.count > budget:
+        problems.append(f"{counter.count} statements, budget is {budget}")
+    if counter.repeated(repeat_limit):
+        problems.append(f"statements repeated more than {repeat_limit} times (N+1?)")
+    if problems:
+        return f"{label}: " + "; ".join(problems) + "\n" + counter.report(repeat_limit)
+    return None
+
+
+def setup_query_budget(app):
+    if not os.getenv("QUERY_BUDGET"):
+        return
+    default_budget = int(os.getenv("QUERY_BUDGET"))
+    repeat_limit = int(os.getenv("QUERY_REPEAT_LIMIT", 3))
+    raise_on_exceeded = os.getenv("QUERY_BUDGET_MODE", "log") == "raise"
+
+    @app.before_request
+    def start_query_counter():
+        counter = QueryCounter()
+        request.environ["query_budget.counter"] = counter
+        counter.__enter__()
+
+    @app.after_request
+    def check_query_budget(response):
+        counter = request.environ.pop("query_budget.counter", None)
+        if counter is None:
+            return response
+        counter.__exit__(None, None, None)
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", default_budget)
+        message = check_budget(counter, budget, repeat_limit, f"{request.method} {request.full_path}")
+        if message is None:
+            return response
+        if raise_on_exceeded:
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+        response.headers["X-Query-Budget-Exceeded"] = str(counter.count)
+        return response
+
+    @app.teardown_request
+    def stop_query_counter(exc):
+        # after_request doesn't run when the view raised
+        counter = request.environ.pop("query_budget.counter", None)
+        if counter is not None:
+            counter.__exit__(None, None, None)
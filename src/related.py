@@ -0,0 +1,65 @@
+"""
+Posts and media of a single planet or character, and the ?include=media
+prefetch of the /people and /planets listings.
+
+Child pages are keyset pages on the (planet_id, ID) / (character_id, ID)
+indexes. Included media is read for a whole page with one IN query and
+grouped in Python, instead of one lazy load of `.medias` per row. The
+statement and grouping halves are separate so the async handlers in asgi.py
+can run the same query on their own session.
+"""
+from collections import defaultdict
+from flask import request
+from sqlalchemy import select
+from models import db, Character, Media, Planet
+from pagination import get_fields, get_page_args, page_statement, split_page
+from serializers import serializer_for
+from utils import APIException
+
+# Column of Media pointing at each model that has media
+MEDIA_OWNERS = {Planet: Media.planet_id, Character: Media.character_id}
+INCLUDES = ("media",)
+
+
+def child_page(model, field, owner_id):
+    """One keyset page of the `model` rows whose `field` is `owner_id`, ordered by ID."""
+    serialize = serializer_for(model, get_fields(model))
+    stmt, limit = child_statement(model, serialize, field, owner_id)
+    return split_page(serialize, db.session.execute(stmt).all(), limit)
+
+
+def child_statement(model, serialize, field, owner_id, args=None):
+    """The statement of child_page() and its limit."""
+    limit, after = get_page_args(args)
+    return page_statement(model, serialize, limit, after).where(getattr(model, field) == owner_id), limit
+
+
+def wants_media(args=None):
+    include = (request.args if args is None else args).get("include", "")
+    requested = [name.strip() for name in include.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in INCLUDES]
+    if unknown:
+        raise APIException("Unknown include: " + ", ".join(unknown), status_code=400, payload={"allowed": list(INCLUDES)})
+    return "media" in requested
+
+
+def media_statement(model, items):
+    owner = MEDIA_OWNERS[model]
+    return (select(Media.ID, Media.url, owner.label("owner_id"))
+            .where(owner.in_([item["ID"] for item in items])).order_by(owner, Media.ID))
+
+
+def attach_media(items, rows):
+    """Sets `media` on every item, in ID order, from the rows of media_statement()."""
+    media = defaultdict(list)
+    for row in rows:
+        media[row.owner_id].append({"ID": row.ID, "url": row.url})
+    for item in items:
+        item["media"] = media.get(item["ID"], [])
+    return items
+
+
+def include_media(model, items):
+    if items:
+        attach_media(items, db.session.execute(media_statement(model, items)))
+    return items
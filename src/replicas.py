@@ -0,0 +1,102 @@
+"""
+Sends the api blueprint's GET handlers to read replicas listed in
+DATABASE_REPLICA_URLS (comma separated) and everything else to DATABASE_URL.
+
+After a favorite POST/DELETE the writing user is pinned to the primary for
+REPLICA_STICKY_SECONDS, through a cookie (works across workers) and a per
+process map keyed by user_id, so they read their own writes. The map only
+holds users who wrote in the last REPLICA_STICKY_SECONDS.
+
+To try it locally point the replicas at copies of the primary, for example two
+SQLite files or a second local Postgres fed by streaming replication.
+"""
+import os
+import random
+import threading
+import time
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+STICKY_COOKIE = "read_primary_until"
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # A session made with bind=connection (explain-queries) runs everything in that connection's transaction
+        if bind is None and self.bind is not None:
+            return self.bind
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get("replica_bind")
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+_sticky_users = {}
+_sticky_lock = threading.Lock()
+
+
+def is_sticky(user_id, cookie_value):
+    try:
+        if float(cookie_value or 0) > time.time():
+            return True
+    except ValueError:
+        pass
+    if user_id is None:
+        return False
+    with _sticky_lock:
+        until = _sticky_users.get(user_id)
+        if until is not None and until <= time.time():
+            del _sticky_users[user_id]
+            return False
+    return until is not None
+
+
+def _pin_user(user_id, until):
+    now = time.time()
+    with _sticky_lock:
+        # Re-inserted so the map stays in expiry order: expired users are all at the front
+        _sticky_users.pop(user_id, None)
+        _sticky_users[user_id] = until
+        while _sticky_users:
+            oldest = next(iter(_sticky_users))
+            if _sticky_users[oldest] > now:
+                break
+            del _sticky_users[oldest]
+
+
+def replica_urls():
+    return [url.strip().replace("postgres://", "postgresql://")
+            for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def setup_replicas(app):
+    urls = replica_urls()
+    if not urls:
+        return
+
+    replica_keys = [f"replica_{index}" for index in range(len(urls))]
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    binds.update(zip(replica_keys, urls))
+    sticky_seconds = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.blueprint == "api" and request.method == "GET" \
+                and not is_sticky(request.args.get("user_id", type=int), request.cookies.get(STICKY_COOKIE)):
+            g.replica_bind = random.choice(replica_keys)
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if request.blueprint == "api" and request.method in ("POST", "DELETE") and response.status_code < 400:
+            until = time.time() + sticky_seconds
+            data = request.get_json(silent=True) or {}
+            try:
+                user_id = int(data.get("user_id"))
+            except (TypeError, ValueError):
+                user_id = None
+            if user_id is not None:
+                _pin_user(user_id, until)
+            response.set_cookie(STICKY_COOKIE, str(until), max_age=int(sticky_seconds) + 1, httponly=True)
+        return response
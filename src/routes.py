@@ -1,76 +1,225 @@
 import os
 from functools import wraps
-from flask import request, jsonify, Blueprint
-from api.models import db, Character, Planet, User, Favorite
+from flask import request, jsonify, Blueprint, current_app
+from models import db, Character, Planet, User, Favorite, Follower, Post, Media, enumPost
 from flask_cors import CORS
+from pagination import keyset_page, page_headers, int_arg, get_page_args
+from streaming import wants_stream, stream_rows
+from cache import get_cached_entity
+from counters import adjust_favorite_counts, favorite_keys, top_favorited
+from followers import follow_page, mutual_page, relationship_between, suggestions
+from feed import feed_page, writes_timelines, backfill_timeline, prune_timeline
+from related import child_page, include_media, wants_media
+from filters import filter_criteria, filtered_page
+from search import SEARCH_MODELS, MAX_SEARCH_LIMIT, MAX_SEARCH_RESULTS, search
+from versioning import conditional, bump_versions
+from utils import APIException, insert_ignore
+from sqlalchemy import select, delete, literal, union_all, or_
+from sqlalchemy.orm import joinedload, raiseload
 
-api = Blueprint('api', __name__)
+api = Blueprint('api', __name__, url_prefix='/api/v1')
 
 CORS(api)
 
 #People
 @api.route('/people', methods=['GET'])
+@conditional("character", "media")
 def get_all_people():
-    characters = Character.query.all()
-    return jsonify([character.serialize() for character in characters]), 200
+    if wants_stream():
+        return stream_rows(Character, *filter_criteria(Character))
+    media = wants_media()
+    characters, next_cursor = filtered_page(Character)
+    if media:
+        include_media(Character, characters)
+    return jsonify(characters), 200, page_headers(next_cursor)
 
 @api.route('/people/<int:character_id>', methods=['GET'])
+@conditional("character")
 def get_single_person(character_id):
-    character = Character.query.get(character_id)
-    if character:
-        return jsonify(character.serialize()), 200
+    body = get_cached_entity(Character, character_id)
+    if body:
+        return current_app.response_class(body, mimetype="application/json"), 200
     return jsonify({"error": "Character not found"}), 404
 
+@api.route('/people/top', methods=['GET'])
+@conditional("character", "favorite")
+def get_top_people():
+    return jsonify(top_favorited(Character, leaderboard_limit())), 200
+
 #Planets
 @api.route('/planets', methods=['GET'])
+@conditional("planet", "media")
 def get_all_planets():
-    planets = Planet.query.all()
-    return jsonify([planet.serialize() for planet in planets]), 200
+    if wants_stream():
+        return stream_rows(Planet, *filter_criteria(Planet))
+    media = wants_media()
+    planets, next_cursor = filtered_page(Planet)
+    if media:
+        include_media(Planet, planets)
+    return jsonify(planets), 200, page_headers(next_cursor)
 
 @api.route('/planets/<int:planet_id>', methods=['GET'])
+@conditional("planet")
 def get_single_planet(planet_id):
-    planet = Planet.query.get(planet_id)
-    if planet:
-        return jsonify(planet.serialize()), 200
+    body = get_cached_entity(Planet, planet_id)
+    if body:
+        return current_app.response_class(body, mimetype="application/json"), 200
     return jsonify({"error": "Planet not found"}), 404
 
+@api.route('/planets/top', methods=['GET'])
+@conditional("planet", "favorite")
+def get_top_planets():
+    return jsonify(top_favorited(Planet, leaderboard_limit())), 200
+
+#Posts and media of one planet or character
+def child_listing(model, field, owner_id, owner, label):
+    items, next_cursor = child_page(model, field, owner_id)
+    # An empty page is the only case worth telling an unknown owner apart
+    if not items and db.session.get(owner, owner_id) is None:
+        return jsonify({"error": f"{label} not found"}), 404
+    return jsonify(items), 200, page_headers(next_cursor)
+
+@api.route('/people/<int:character_id>/posts', methods=['GET'])
+@conditional("character", "post")
+def get_person_posts(character_id):
+    return child_listing(Post, "character_id", character_id, Character, "Character")
+
+@api.route('/people/<int:character_id>/media', methods=['GET'])
+@conditional("character", "media")
+def get_person_media(character_id):
+    return child_listing(Media, "character_id", character_id, Character, "Character")
+
+@api.route('/planets/<int:planet_id>/posts', methods=['GET'])
+@conditional("planet", "post")
+def get_planet_posts(planet_id):
+    return child_listing(Post, "planet_id", planet_id, Planet, "Planet")
+
+@api.route('/planets/<int:planet_id>/media', methods=['GET'])
+@conditional("planet", "media")
+def get_planet_media(planet_id):
+    return child_listing(Media, "planet_id", planet_id, Planet, "Planet")
+
+#Search
+@api.route('/search', methods=['GET'])
+@conditional("character", "planet")
+def search_entities():
+    kinds = search_kinds(request.args)
+    unknown = [kind for kind in kinds if kind not in SEARCH_MODELS]
+    if unknown or not kinds:
+        return jsonify({"error": "Unknown type: " + ", ".join(unknown), "allowed": list(SEARCH_MODELS)}), 400
+
+    limit, offset = search_page_args(request.args)
+    results, next_offset = search(request.args.get("q"), kinds, limit, offset)
+    return jsonify(results), 200, page_headers(next_offset)
+
+def search_kinds(args):
+    return [kind.strip() for kind in args.get("type", ",".join(SEARCH_MODELS)).split(",") if kind.strip()]
+
+def search_page_args(args):
+    # `after` counts the results already returned: ranked results have no stable ID order
+    limit, after = get_page_args(args)
+    offset = after or 0
+    if not 0 <= offset < MAX_SEARCH_RESULTS:
+        raise APIException(f"after must be between 0 and {MAX_SEARCH_RESULTS - 1}", status_code=400)
+    return min(limit, MAX_SEARCH_LIMIT), offset
+
+#Leaderboards
+MAX_LEADERBOARD_LIMIT = 100
+
+def leaderboard_limit(args=None):
+    limit = int_arg(request.args if args is None else args, "limit", 10)
+    if not 1 <= limit <= MAX_LEADERBOARD_LIMIT:
+        raise APIException(f"limit must be between 1 and {MAX_LEADERBOARD_LIMIT}", status_code=400)
+    return limit
+
 #Users
 @api.route('/users', methods=['GET'])
+@conditional("user")
 def get_all_users():
-    users = User.query.all()
-    return jsonify([user.serialize() for user in users]), 200
+    if wants_stream():
+        return stream_rows(User)
+    users, next_cursor = keyset_page(User)
+    return jsonify(users), 200, page_headers(next_cursor)
+
+FAVORITE_EXPANDS = {"planet": Favorite.planet, "character": Favorite.character}
+
+def favorite_expands(args):
+    return [name.strip() for name in args.get("expand", "").split(",") if name.strip()]
+
+def expanded_tables(args):
+    """The tables ?expand= pulls rows from, so editing an expanded planet or character changes the ETag."""
+    return [name for name in favorite_expands(args) if name in FAVORITE_EXPANDS]
 
 @api.route('/users/favorites', methods=['GET'])
+@conditional("favorite", depends=expanded_tables)
 def get_all_favorites_from_user():
     user_id = request.args.get("user_id", type=int)
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
 
-    favorites = Favorite.query.filter_by(user_id=user_id).all()
+    expand = favorite_expands(request.args)
+    unknown = [name for name in expand if name not in FAVORITE_EXPANDS]
+    if unknown:
+        return jsonify({"error": "Unknown expand: " + ", ".join(unknown), "allowed": list(FAVORITE_EXPANDS)}), 400
+
+    if wants_stream():
+        # The stream sends favorite rows only, rather than silently dropping the expansion
+        if expand:
+            return jsonify({"error": "expand can't be combined with streaming"}), 400
+        return stream_rows(Favorite, Favorite.user_id == user_id)
+
+    # Related rows come in through the same query; raiseload turns any other lazy load into an error
+    options = [joinedload(FAVORITE_EXPANDS[name]) for name in expand] + [raiseload("*")]
+    favorites = db.session.scalars(
+        select(Favorite).where(Favorite.user_id == user_id).order_by(Favorite.ID).options(*options)).all()
     if favorites:
-        return jsonify([favorite.serialize() for favorite in favorites]), 200
+        return jsonify([favorite.serialize(expand) for favorite in favorites]), 200
     return jsonify({"error": "There are no favorites for this user"}), 404
 
 
+def json_id(data, field):
+    """
+    The `field` of a JSON body as an int, or None when it is missing. Digit
+    strings are accepted, as the ORM used to convert them; the Core writes
+    below would otherwise bind them as text.
+    """
+    value = data.get(field)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise APIException(f"{field} must be an integer", status_code=400)
+    try:
+        return int(value)
+    except ValueError:
+        raise APIException(f"{field} must be an integer", status_code=400)
+
+
+def json_user_id(data):
+    return json_id(data, "user_id")
+
+
 #Posts
 @api.route('/favorite/planet/<int:planet_id>', methods=['POST'])
 def add_planet_to_favorites(planet_id):
     data = request.get_json()
-    user_id = data.get("user_id")
+    user_id = json_user_id(data)
 
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    planet = Planet.query.get(planet_id)
-    if not planet:
-        return jsonify({"error": "Planet not found"}), 404
-
-    existing_fav = Favorite.query.filter_by(user_id=user_id, planet_id=planet_id).first()
-    if existing_fav:
+    # Single statement: the SELECT yields no row for an unknown planet and the
+    # unique index turns a duplicate into a no-op, so rowcount 0 means one of the two
+    stmt = insert_ignore(Favorite).from_select(
+        ["user_id", "planet_id"],
+        select(literal(user_id), Planet.ID).where(Planet.ID == planet_id))
+    if db.session.execute(stmt).rowcount == 0:
+        db.session.rollback()
+        if db.session.get(Planet, planet_id) is None:
+            return jsonify({"error": "Planet not found"}), 404
         return jsonify({"error": "Planet already in favorites"}), 400
 
-    new_fav = Favorite(user_id=user_id, planet_id=planet_id)
-    db.session.add(new_fav)
+    adjust_favorite_counts(db.session.connection(), [("planet_id", planet_id)], 1)
+    bump_versions(db.session.connection(), ["favorite"])
     db.session.commit()
 
     return jsonify({"message": "Planet added to favorites"}), 201
@@ -79,21 +228,24 @@ def add_planet_to_favorites(planet_id):
 @api.route('/favorite/people/<int:character_id>', methods=['POST'])
 def add_character_to_favorites(character_id):
     data = request.get_json()
-    user_id = data.get("user_id")
+    user_id = json_user_id(data)
 
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    character = Character.query.get(character_id)
-    if not character:
-        return jsonify({"error": "Character not found"}), 404
-
-    existing_fav = Favorite.query.filter_by(user_id=user_id, character_id=character_id).first()
-    if existing_fav:
+    # Single statement: the SELECT yields no row for an unknown character and the
+    # unique index turns a duplicate into a no-op, so rowcount 0 means one of the two
+    stmt = insert_ignore(Favorite).from_select(
+        ["user_id", "character_id"],
+        select(literal(user_id), Character.ID).where(Character.ID == character_id))
+    if db.session.execute(stmt).rowcount == 0:
+        db.session.rollback()
+        if db.session.get(Character, character_id) is None:
+            return jsonify({"error": "Character not found"}), 404
         return jsonify({"error": "Character already in favorites"}), 400
 
-    new_fav = Favorite(user_id=user_id, character_id=character_id)
-    db.session.add(new_fav)
+    adjust_favorite_counts(db.session.connection(), [("character_id", character_id)], 1)
+    bump_versions(db.session.connection(), ["favorite"])
     db.session.commit()
 
     return jsonify({"message": "Character added to favorites"}), 201
@@ -102,16 +254,21 @@ def add_character_to_favorites(character_id):
 @api.route('/favorite/planet/<int:planet_id>', methods=['DELETE'])
 def delete_planet_from_favorites(planet_id):
     data = request.json
-    user_id = data.get("user_id")
+    user_id = json_user_id(data)
 
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    favorite = Favorite.query.filter_by(user_id=user_id, planet_id=planet_id).first()
-    if not favorite:
+    # One DELETE; concurrent deletes of the same favorite can't both succeed
+    deleted = db.session.execute(
+        delete(Favorite).where(Favorite.user_id == user_id, Favorite.planet_id == planet_id)
+        .execution_options(synchronize_session=False)).rowcount
+    if not deleted:
+        db.session.rollback()
         return jsonify({"error": "Planet not found in favorites"}), 404
-    
-    db.session.delete(favorite)
+
+    adjust_favorite_counts(db.session.connection(), [("planet_id", planet_id)] * deleted, -1)
+    bump_versions(db.session.connection(), ["favorite"])
     db.session.commit()
     
     return jsonify({"message": "Planet deleted from favorites"}), 200
@@ -120,19 +277,270 @@ def delete_planet_from_favorites(planet_id):
 @api.route('/favorite/people/<int:character_id>', methods=['DELETE'])
 def delete_character_from_favorites(character_id):
     data = request.json
-    user_id = data.get("user_id")
+    user_id = json_user_id(data)
 
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    favorite = Favorite.query.filter_by(user_id=user_id, character_id=character_id).first()
-    if not favorite:
+    # One DELETE; concurrent deletes of the same favorite can't both succeed
+    deleted = db.session.execute(
+        delete(Favorite).where(Favorite.user_id == user_id, Favorite.character_id == character_id)
+        .execution_options(synchronize_session=False)).rowcount
+    if not deleted:
+        db.session.rollback()
         return jsonify({"error": "Character not found in favorites"}), 404
-    
-    db.session.delete(favorite)
+
+    adjust_favorite_counts(db.session.connection(), [("character_id", character_id)] * deleted, -1)
+    bump_versions(db.session.connection(), ["favorite"])
     db.session.commit()
     
     return jsonify({"message": "Character deleted from favorites"}), 200
 
-    
 
+#Batch
+MAX_FAVORITE_BATCH = 500
+FAVORITE_TARGETS = {"planet_id": Planet, "character_id": Character}
+
+def read_favorite_batch():
+    data = request.get_json(silent=True) or {}
+    user_id = json_user_id(data)
+    items = data.get("items")
+
+    if not user_id:
+        raise APIException("user_id is required", status_code=400)
+    if not isinstance(items, list) or not items:
+        raise APIException("items must be a non empty list", status_code=400)
+    if len(items) > MAX_FAVORITE_BATCH:
+        raise APIException(f"items can have at most {MAX_FAVORITE_BATCH} entries", status_code=400)
+
+    keys = []
+    for item in items:
+        fields = [field for field in FAVORITE_TARGETS if isinstance(item, dict) and field in item]
+        if len(fields) == 1 and type(item[fields[0]]) is int:
+            keys.append((fields[0], item[fields[0]]))
+        else:
+            keys.append(None)
+    return user_id, keys
+
+
+def favorite_filter(user_id, keys):
+    ids = {field: {key[1] for key in keys if key and key[0] == field} for field in FAVORITE_TARGETS}
+    return (Favorite.user_id == user_id) & or_(*[getattr(Favorite, field).in_(ids[field])
+                                                 for field in FAVORITE_TARGETS if ids[field]])
+
+
+def batch_result(key, status):
+    return dict([key], status=status) if key else {"status": "invalid"}
+
+
+@api.route('/favorites/batch', methods=['POST'])
+def add_favorites_batch():
+    user_id, keys = read_favorite_batch()
+    valid = [key for key in keys if key]
+
+    found, existing = set(), set()
+    if valid:
+        # One round trip checks every target exists, one more finds the ones already favorited
+        checks = [select(literal(field).label("field"), model.ID.label("id"))
+                  .where(model.ID.in_({key[1] for key in valid if key[0] == field}))
+                  for field, model in FAVORITE_TARGETS.items()]
+        found = {(row.field, row.id) for row in db.session.execute(union_all(*checks))}
+        for row in db.session.execute(select(Favorite.planet_id, Favorite.character_id).where(favorite_filter(user_id, valid))):
+            existing.add(("planet_id", row.planet_id) if row.planet_id is not None else ("character_id", row.character_id))
+
+    results, rows = [], []
+    for key in keys:
+        if key is None:
+            status = "invalid"
+        elif key not in found:
+            status = "not_found"
+        elif key in existing:
+            status = "duplicate"
+        else:
+            status = "added"
+            existing.add(key)
+            rows.append({"user_id": user_id, "planet_id": None, "character_id": None, key[0]: key[1]})
+        results.append(batch_result(key, status))
+
+    if rows:
+        stmt = insert_ignore(Favorite)
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            # Only rows that were really inserted come back, a concurrent add of the same pair is not counted twice
+            inserted = favorite_keys(db.session.execute(stmt.returning(Favorite.planet_id, Favorite.character_id), rows))
+        else:
+            db.session.execute(stmt, rows)
+            inserted = [key for key, result in zip(keys, results) if result["status"] == "added"]
+        adjust_favorite_counts(db.session.connection(), inserted, 1)
+        bump_versions(db.session.connection(), ["favorite"])
+        db.session.commit()
+
+    return jsonify({"user_id": user_id, "results": results}), 200
+
+
+@api.route('/favorites/batch', methods=['DELETE'])
+def delete_favorites_batch():
+    user_id, keys = read_favorite_batch()
+    valid = [key for key in keys if key]
+
+    matches = {}
+    if valid:
+        for row in db.session.execute(select(Favorite.ID, Favorite.planet_id, Favorite.character_id).where(favorite_filter(user_id, valid))):
+            key = ("planet_id", row.planet_id) if row.planet_id is not None else ("character_id", row.character_id)
+            matches.setdefault(key, []).append(row.ID)
+
+    results, favorite_ids = [], []
+    for key in keys:
+        if key is None:
+            status = "invalid"
+        elif key in matches:
+            status = "deleted"
+            favorite_ids.extend(matches.pop(key))
+        else:
+            status = "not_found"
+        results.append(batch_result(key, status))
+
+    if favorite_ids:
+        stmt = delete(Favorite).where(Favorite.ID.in_(favorite_ids)).execution_options(synchronize_session=False)
+        if db.session.get_bind().dialect.delete_returning:
+            deleted = favorite_keys(db.session.execute(stmt.returning(Favorite.planet_id, Favorite.character_id)))
+        else:
+            db.session.execute(stmt)
+            deleted = [key for key, result in zip(keys, results) if result["status"] == "deleted"]
+        adjust_favorite_counts(db.session.connection(), deleted, -1)
+        bump_versions(db.session.connection(), ["favorite"])
+        db.session.commit()
+
+    return jsonify({"user_id": user_id, "results": results}), 200
+
+
+#Followers
+MAX_SUGGESTIONS = 50
+
+@api.route('/users/<int:user_id>/followers', methods=['GET'])
+@conditional("follower", "user")
+def get_followers(user_id):
+    users, next_cursor = follow_page(user_id, "followers")
+    return jsonify(users), 200, page_headers(next_cursor)
+
+@api.route('/users/<int:user_id>/following', methods=['GET'])
+@conditional("follower", "user")
+def get_following(user_id):
+    users, next_cursor = follow_page(user_id, "following")
+    return jsonify(users), 200, page_headers(next_cursor)
+
+@api.route('/users/<int:user_id>/mutuals', methods=['GET'])
+@conditional("follower", "user")
+def get_mutuals(user_id):
+    users, next_cursor = mutual_page(user_id)
+    return jsonify(users), 200, page_headers(next_cursor)
+
+@api.route('/users/<int:user_id>/relationship/<int:other_id>', methods=['GET'])
+@conditional("follower")
+def get_relationship(user_id, other_id):
+    return jsonify(relationship_between(user_id, other_id)), 200
+
+@api.route('/users/<int:user_id>/suggestions', methods=['GET'])
+@conditional("follower", "user")
+def get_suggestions(user_id):
+    return jsonify(suggestions(user_id, suggestions_limit())), 200
+
+def suggestions_limit(args=None):
+    limit = int_arg(request.args if args is None else args, "limit", 10)
+    if not 1 <= limit <= MAX_SUGGESTIONS:
+        raise APIException(f"limit must be between 1 and {MAX_SUGGESTIONS}", status_code=400)
+    return limit
+
+
+@api.route('/follow/<int:user_id>', methods=['POST'])
+def follow_user(user_id):
+    data = request.get_json()
+    follower_id = json_user_id(data)
+
+    if not follower_id:
+        return jsonify({"error": "user_id is required"}), 400
+    if follower_id == user_id:
+        return jsonify({"error": "Users can't follow themselves"}), 400
+
+    # Same single statement as the favorites: no row for an unknown user, a no-op for a duplicate
+    stmt = insert_ignore(Follower).from_select(
+        ["user_from_id", "user_to_id"],
+        select(literal(follower_id), User.ID).where(User.ID == user_id))
+    if db.session.execute(stmt).rowcount == 0:
+        db.session.rollback()
+        if db.session.get(User, user_id) is None:
+            return jsonify({"error": "User not found"}), 404
+        return jsonify({"error": "User already followed"}), 400
+
+    if writes_timelines():
+        backfill_timeline(db.session.connection(), follower_id, user_id)
+    bump_versions(db.session.connection(), ["follower"])
+    db.session.commit()
+
+    return jsonify({"message": "User followed"}), 201
+
+
+@api.route('/follow/<int:user_id>', methods=['DELETE'])
+def unfollow_user(user_id):
+    data = request.json
+    follower_id = json_user_id(data)
+
+    if not follower_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    deleted = db.session.execute(
+        delete(Follower).where(Follower.user_from_id == follower_id, Follower.user_to_id == user_id)
+        .execution_options(synchronize_session=False)).rowcount
+    if not deleted:
+        db.session.rollback()
+        return jsonify({"error": "User not followed"}), 404
+
+    if writes_timelines():
+        prune_timeline(db.session.connection(), follower_id, user_id)
+    bump_versions(db.session.connection(), ["follower"])
+    db.session.commit()
+
+    return jsonify({"message": "User unfollowed"}), 200
+
+
+#Feed
+@api.route('/feed', methods=['GET'])
+@conditional("post", "follower")
+def get_feed():
+    user_id = request.args.get("user_id", type=int)
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    posts, next_cursor = feed_page(user_id)
+    return jsonify(posts), 200, page_headers(next_cursor)
+
+
+POST_TARGETS = {"planet_id": (Planet, enumPost.Planet), "character_id": (Character, enumPost.Character)}
+
+@api.route('/posts', methods=['POST'])
+def create_post():
+    data = request.get_json(silent=True) or {}
+    user_id = json_user_id(data)
+    description = data.get("description")
+
+    if not user_id or not description:
+        return jsonify({"error": "user_id and description are required"}), 400
+    if not isinstance(description, str):
+        raise APIException("description must be a string", status_code=400)
+    targets = {field: json_id(data, field) for field in POST_TARGETS}
+    targets = {field: target_id for field, target_id in targets.items() if target_id is not None}
+    if len(targets) != 1:
+        return jsonify({"error": "Exactly one of planet_id or character_id is required"}), 400
+
+    (field, target_id), = targets.items()
+    model, post_type = POST_TARGETS[field]
+    if db.session.get(User, user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+    if db.session.get(model, target_id) is None:
+        return jsonify({"error": f"{model.__name__} not found"}), 404
+
+    # With FEED_STRATEGY=write the insert fans out to the followers' timelines, see feed.py
+    post = Post(description=description, type=post_type, user_id=user_id, **{field: target_id})
+    db.session.add(post)
+    db.session.commit()
+
+    return jsonify(post.serialize()), 201
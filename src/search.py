@@ -0,0 +1,177 @@
+"""
+GET /search: typo-tolerant prefix search over character names and planet names.
+
+PostgreSQL matches each word as a tsquery prefix ("luk:*") and, for typos,
+by pg_trgm word similarity. Both go through GIN indexes on the name column,
+and the score is the better of ts_rank and word_similarity. SQLite has
+neither, so every name is also kept in an FTS5 table with the trigram
+tokenizer (character_search, planet_search, rowid = ID). The query is split
+into trigrams OR'ed together, which matches prefixes and substrings and
+survives a typo. bm25 then ranks the names that share the most trigrams
+first.
+
+The PostgreSQL indexes maintain themselves. The FTS5 tables are written by
+the mapper events below for ORM writes. rebuild_search_index() refills them
+after Core bulk loads such as seed.py. Neither kind of object is in the
+model metadata: they are created by the DDL listeners below on create_all()
+and by migration for real databases.
+"""
+import re
+from sqlalchemy import event, func, inspect, literal, literal_column, or_, select, text, union_all
+from sqlalchemy.sql import column, table
+from models import db, Character, Planet
+from serializers import serializer_for
+from utils import APIException
+
+# kind: (model, searched column)
+SEARCH_MODELS = {"character": (Character, "fullname"), "planet": (Planet, "name")}
+MIN_QUERY_LENGTH = 3
+MAX_SEARCH_LIMIT = 50
+# Ranked results are paged by position, so deep pages are capped
+MAX_SEARCH_RESULTS = 1000
+
+
+def search_table(kind):
+    return f"{kind}_search"
+
+
+def create_search_objects(connection):
+    for kind, (model, field) in SEARCH_MODELS.items():
+        if connection.dialect.name == "sqlite":
+            connection.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table(kind)} "
+                                    f"USING fts5({field}, tokenize='trigram')"))
+        elif connection.dialect.name == "postgresql":
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{kind}_search_trgm ON "{kind}" '
+                                    f"USING gin ({field} gin_trgm_ops)"))
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{kind}_search_tsv ON "{kind}" '
+                                    f"USING gin (to_tsvector('simple', {field}))"))
+
+
+def drop_search_objects(connection):
+    if connection.dialect.name == "sqlite":
+        for kind in SEARCH_MODELS:
+            connection.execute(text(f"DROP TABLE IF EXISTS {search_table(kind)}"))
+
+
+def rebuild_search_index(connection):
+    """Refills the SQLite FTS5 tables from the entity tables; PostgreSQL indexes need nothing."""
+    if connection.dialect.name != "sqlite":
+        return
+    for kind, (model, field) in SEARCH_MODELS.items():
+        connection.execute(text(f"DELETE FROM {search_table(kind)}"))
+        connection.execute(text(f'INSERT INTO {search_table(kind)} (rowid, {field}) '
+                                f'SELECT "ID", {field} FROM "{model.__tablename__}"'))
+
+
+def search_terms(q):
+    q = " ".join((q or "").lower().split())
+    if len(q) < MIN_QUERY_LENGTH:
+        raise APIException(f"q must be at least {MIN_QUERY_LENGTH} characters", status_code=400)
+    return q
+
+
+def fts_query(q):
+    # Quoted so FTS5 syntax characters in the query are plain text
+    trigrams = dict.fromkeys(q[i:i + 3] for i in range(len(q) - 2))
+    return " OR ".join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams)
+
+
+def ranked_statement(dialect, kind, q):
+    """(kind, ID, score) of every match of `q` among the `kind` rows, higher score first."""
+    model, field = SEARCH_MODELS[kind]
+    if dialect == "sqlite":
+        fts = table(search_table(kind), column("rowid"))
+        return (select(literal(kind).label("kind"), fts.c.rowid.label("ID"),
+                       (-func.bm25(literal_column(fts.name))).label("score"))
+                .select_from(fts).where(literal_column(fts.name).op("MATCH")(fts_query(q))))
+    name = getattr(model, field)
+    words = re.findall(r"\w+", q)
+    vector = func.to_tsvector(literal_column("'simple'"), name)
+    matches = []
+    if words:
+        prefix = func.to_tsquery(literal_column("'simple'"), " & ".join(word + ":*" for word in words))
+        matches.append(vector.op("@@")(prefix))
+        rank = func.ts_rank(vector, prefix)
+    else:
+        rank = literal(0)
+    similarity = func.word_similarity(q, name)
+    matches.append(literal(q).op("<%")(name))
+    return select(literal(kind).label("kind"), model.ID, func.greatest(rank, similarity).label("score")).where(or_(*matches))
+
+
+def search(q, kinds, limit, offset):
+    """One page of search results for `q` across `kinds`, and the offset of the next page or None."""
+    stmt = hits_statement(db.session.get_bind().dialect.name, search_terms(q), kinds, limit, offset)
+    hits = db.session.execute(stmt).all()
+    rows = {}
+    for kind, serialize, stmt in entity_statements(kinds, hits[:limit]):
+        rows.update(((kind, row.ID), serialize(row)) for row in db.session.execute(stmt))
+    return search_results(hits, rows, limit, offset)
+
+
+# The halves of search(), asgi.py runs the statements on its own session
+def hits_statement(dialect, q, kinds, limit, offset):
+    """(kind, ID, score) of the `limit` + 1 best matches from `offset`."""
+    ranked = union_all(*(ranked_statement(dialect, kind, q) for kind in kinds)).subquery()
+    return (select(ranked.c.kind, ranked.c.ID, ranked.c.score)
+            .order_by(ranked.c.score.desc(), ranked.c.kind, ranked.c.ID)
+            .offset(offset).limit(limit + 1))
+
+
+def entity_statements(kinds, hits):
+    """(kind, serializer, statement) reading the rows of `hits`, one IN query per kind."""
+    for kind in kinds:
+        ids = [hit.ID for hit in hits if hit.kind == kind]
+        if ids:
+            model, _ = SEARCH_MODELS[kind]
+            serialize = serializer_for(model)
+            yield kind, serialize, select(*serialize.columns).where(model.ID.in_(ids))
+
+
+def search_results(hits, rows, limit, offset):
+    """The page of results from the hits and the serialized rows keyed by (kind, ID)."""
+    results = [dict(rows[hit.kind, hit.ID], type=hit.kind, score=round(hit.score, 4))
+               for hit in hits[:limit] if (hit.kind, hit.ID) in rows]
+    next_offset = offset + limit if len(hits) > limit and offset + limit < MAX_SEARCH_RESULTS else None
+    return results, next_offset
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_search_objects(metadata, connection, **kw):
+    create_search_objects(connection)
+
+
+@event.listens_for(db.metadata, "after_drop")
+def _drop_search_objects(metadata, connection, **kw):
+    drop_search_objects(connection)
+
+
+def _sync_search_row(kind, connection, target, remove=False, add=False):
+    if connection.dialect.name != "sqlite":
+        return
+    _, field = SEARCH_MODELS[kind]
+    if remove:
+        connection.execute(text(f"DELETE FROM {search_table(kind)} WHERE rowid = :id"), {"id": target.ID})
+    if add:
+        connection.execute(text(f"INSERT INTO {search_table(kind)} (rowid, {field}) VALUES (:id, :value)"),
+                           {"id": target.ID, "value": getattr(target, field)})
+
+
+def _listen(kind, model, field):
+    @event.listens_for(model, "after_insert")
+    def _index_inserted(mapper, connection, target):
+        _sync_search_row(kind, connection, target, add=True)
+
+    @event.listens_for(model, "after_update")
+    def _index_updated(mapper, connection, target):
+        if inspect(target).attrs[field].history.has_changes():
+            _sync_search_row(kind, connection, target, remove=True, add=True)
+
+    @event.listens_for(model, "after_delete")
+    def _index_deleted(mapper, connection, target):
+        _sync_search_row(kind, connection, target, remove=True)
+
+
+for _kind, (_model, _field) in SEARCH_MODELS.items():
+    _listen(_kind, _model, _field)
@@ -0,0 +1,108 @@
+import os
+from decimal import Decimal
+from functools import lru_cache
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import String, type_coerce
+from sqlalchemy import Enum as SQLAEnum
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the default provider is used without it
+    orjson = None
+
+
+class RowSerializer:
+    """
+    Turns Core `Row` tuples into dicts using a column layout computed once.
+    Enum columns are selected as their raw stored names and mapped through a
+    precomputed name -> string table, skipping SQLAlchemy's per-row enum
+    coercion and the `.value` lookup on every instance.
+    Select `serializer.columns` so the row layout matches.
+    """
+
+    def __init__(self, model, fields):
+        self.keys = tuple(fields)
+        columns, enum_tables = [], []
+        for index, field in enumerate(self.keys):
+            column = getattr(model, field)
+            if isinstance(column.type, SQLAEnum):
+                enum_tables.append((index, enum_table(column.type)))
+                column = type_coerce(column, String).label(field)
+            columns.append(column)
+        self.columns = tuple(columns)
+        self.enum_tables = tuple(enum_tables)
+
+    def __call__(self, row):
+        if not self.enum_tables:
+            return dict(zip(self.keys, row))
+        values = list(row)
+        for index, table in self.enum_tables:
+            values[index] = table.get(values[index])
+        return dict(zip(self.keys, values))
+
+    def many(self, rows):
+        return [self(row) for row in rows]
+
+
+def enum_table(enum_type):
+    return {member.name: member.value for member in enum_type.enum_class}
+
+
+@lru_cache(maxsize=None)
+def _serializer(model, fields):
+    return RowSerializer(model, fields)
+
+
+def serializer_for(model, fields=None):
+    return _serializer(model, tuple(fields or model.PUBLIC_FIELDS))
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson. Responses are encoded straight to bytes,
+    dates are emitted as ISO 8601 strings.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Trailing newline like the default provider, see json_body()
+        return self._app.response_class(
+            orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype)
+
+
+def json_body(obj, app=None):
+    """
+    `obj` encoded exactly as jsonify() sends it: compact, with a trailing newline.
+    For bodies built outside a Flask view (the entity cache, asgi.py), so a
+    resource is the same bytes under its strong ETag whichever path serves it.
+    """
+    app = app or current_app
+    # orjson ignores the separators, its output is always compact
+    return (app.json.dumps(obj, separators=(",", ":")) + "\n").encode()
+
+
+def setup_json_provider(app):
+    if os.getenv("JSON_PROVIDER", "default") == "orjson":
+        if orjson is None:
+            app.logger.warning("JSON_PROVIDER=orjson but orjson is not installed, using the default provider")
+        else:
+            app.json_provider_class = OrjsonProvider
+            app.json = OrjsonProvider(app)
+    # Compact in debug too, so jsonify() and json_body() never disagree
+    app.json.compact = True
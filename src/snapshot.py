@@ -0,0 +1,279 @@
+"""
+Opt-in in-memory copy of the character and planet tables (CATALOG_SNAPSHOT=1).
+
+Each worker process loads both tables once and keeps every row as
+pre-encoded JSON in a single bytes buffer, newline separated. Two arrays
+hold the sorted IDs and the row offsets, so a table costs its JSON size plus
+16 bytes per row and no Python object per row. Serving from that buffer:
+- a single entity is one bisect and one slice;
+- a keyset page is one slice with the newlines turned into commas;
+- the NDJSON stream of the whole table is the buffer itself.
+
+Plain GET /people, /planets, /people/<id> and /planets/<id> (with limit,
+after, stream) are answered from memory by a before_request hook, with the
+same JSON, ETag and Link headers as the database path. Requests using
+fields, filters, sort or include go to the database as before.
+
+A daemon thread per process keeps the copy current. It re-reads
+table_version every CATALOG_POLL_SECONDS and reloads only the tables whose
+version moved. On PostgreSQL with psycopg2 or psycopg it also LISTENs on
+the channel bump_versions() notifies, so a committed write wakes it
+immediately, and a LISTEN connection that fails is replaced on the next
+round. If refreshes stop for three intervals, requests fall back to
+the database rather than serve an unbounded stale copy.
+"""
+import bisect
+import logging
+import os
+import selectors
+import threading
+import time
+from array import array
+from sqlalchemy import select
+from werkzeug.http import http_date
+from models import db, Character, Planet
+from pagination import get_page_args
+from streaming import NDJSON_MIMETYPE
+from serializers import json_body, serializer_for
+from utils import APIException
+from versioning import VERSION_CHANNEL, is_not_modified, validators, versions_from_rows, versions_statement
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MODELS = {"character": Character, "planet": Planet}
+# /people and /planets also depend on media since ?include=media, see their @conditional
+VERSIONED_TABLES = ("character", "media", "planet")
+# endpoint: (table, is the collection, tables of its @conditional, label for 404s)
+ENDPOINTS = {
+    "api.get_all_people": ("character", True, ("character", "media"), "Character"),
+    "api.get_single_person": ("character", False, ("character",), "Character"),
+    "api.get_all_planets": ("planet", True, ("planet", "media"), "Planet"),
+    "api.get_single_planet": ("planet", False, ("planet",), "Planet"),
+}
+PAGE_ARGS = {"limit", "after", "user_id"}
+STREAM_ARGS = {"stream", "user_id"}
+
+catalog = None
+
+
+class SnapshotTable:
+    """
+    Every row of one table as JSON in one buffer; `offsets[i]` is where row `ids[i]` starts.
+    `lines` are the rows encoded by json_body(), each ending with a newline.
+    """
+    __slots__ = ("ids", "offsets", "blob")
+
+    def __init__(self, ids, lines):
+        self.ids = array("q", ids)
+        self.offsets = array("Q", [0])
+        for line in lines:
+            self.offsets.append(self.offsets[-1] + len(line))
+        self.blob = b"".join(lines)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, entity_id):
+        index = bisect.bisect_left(self.ids, entity_id)
+        if index < len(self.ids) and self.ids[index] == entity_id:
+            return self.blob[self.offsets[index]:self.offsets[index + 1]]
+        return None
+
+    def page(self, after, limit):
+        """The JSON array of up to `limit` rows after ID `after`, and the next cursor like split_page()."""
+        start = 0 if after is None else bisect.bisect_right(self.ids, after)
+        end = min(start + limit, len(self.ids))
+        rows = self.blob[self.offsets[start]:self.offsets[end]]
+        next_cursor = self.ids[end - 1] if end < len(self.ids) else None
+        return b"[" + rows[:-1].replace(b"\n", b",") + b"]\n", next_cursor
+
+    def nbytes(self):
+        return len(self.blob) + self.ids.itemsize * len(self.ids) + self.offsets.itemsize * len(self.offsets)
+
+
+class CatalogSnapshot:
+    __slots__ = ("app", "poll_seconds", "tables", "versions", "checked_at", "pid", "lock")
+
+    def __init__(self, app, poll_seconds):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self.tables = {}
+        self.versions = {}
+        self.checked_at = 0.0
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        """Loads the tables and starts the refresh thread, once per process (workers fork after import)."""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # Tables loaded before a fork are kept (and shared) unless their version moved
+            with self.app.app_context():
+                self.refresh()
+            self.pid = os.getpid()
+            threading.Thread(target=self.watch, name="catalog-snapshot", daemon=True).start()
+
+    def is_fresh(self):
+        return self.pid == os.getpid() and time.monotonic() - self.checked_at < 3 * self.poll_seconds
+
+    def load(self, connection, model):
+        serialize = serializer_for(model)
+        rows = connection.execute(select(*serialize.columns).order_by(model.ID)).all()
+        return SnapshotTable([row.ID for row in rows], [json_body(serialize(row), self.app) for row in rows])
+
+    def refresh(self):
+        """Re-reads the table versions and reloads the snapshot tables whose version moved."""
+        with db.engine.connect() as connection:
+            rows = connection.execute(versions_statement(VERSIONED_TABLES)).all()
+            versions = dict(zip(VERSIONED_TABLES, versions_from_rows(VERSIONED_TABLES, rows)))
+            tables = dict(self.tables)
+            # Versions are read before the rows, so a concurrent write is picked up next time
+            for name, model in SNAPSHOT_MODELS.items():
+                if name not in tables or versions[name] != self.versions.get(name):
+                    tables[name] = self.load(connection, model)
+        self.tables, self.versions, self.checked_at = tables, versions, time.monotonic()
+
+    def watch(self):
+        with self.app.app_context():
+            wait = None
+            while True:
+                try:
+                    if wait is None:
+                        wait = notification_waiter(db.engine)
+                    wait(self.poll_seconds)
+                    self.refresh()
+                except Exception:
+                    logger.exception("catalog snapshot refresh failed")
+                    # The LISTEN connection may be what broke, the next round opens a new one
+                    close_waiter(wait)
+                    wait = None
+                    time.sleep(self.poll_seconds)
+
+    def serve(self, endpoint, view_args, args, variant, if_none_match, if_modified_since, stream, link_headers):
+        """
+        (status, body, mimetype, headers) for a request the snapshot can answer,
+        or None to let the database path handle it.
+        """
+        name, collection, tables, label = ENDPOINTS[endpoint]
+        table = self.tables[name]
+        headers = {}
+        if collection:
+            if set(args.keys()) - (STREAM_ARGS if stream else PAGE_ARGS):
+                return None
+            if stream:
+                body, mimetype = table.blob, NDJSON_MIMETYPE
+            else:
+                try:
+                    limit, after = get_page_args(args)
+                except APIException:
+                    # The database path answers with its own 400
+                    return None
+                body, next_cursor = table.page(after, limit)
+                mimetype, headers = "application/json", link_headers(next_cursor)
+        else:
+            body, mimetype = table.row(next(iter(view_args.values()))), "application/json"
+            if body is None:
+                return 404, json_body({"error": f"{label} not found"}, self.app), mimetype, {}
+
+        etag, last_modified = validators(tables, [self.versions[table_name] for table_name in tables], variant)
+        if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+            status, body, headers = 304, b"", {}
+        else:
+            status = 200
+        headers = dict(headers, ETag=f'"{etag}"', Vary="Accept")
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        return status, body, mimetype, headers
+
+    def memory_report(self):
+        """Rows, bytes and bytes per row of every snapshot table."""
+        return {name: {"rows": len(table), "bytes": table.nbytes(),
+                       "bytes_per_row": round(table.nbytes() / len(table), 1) if len(table) else 0}
+                for name, table in self.tables.items()}
+
+
+def _touches_snapshot(payload):
+    return any(table in SNAPSHOT_MODELS for table in payload.split(","))
+
+
+def notification_waiter(engine):
+    """
+    A wait(timeout) that returns after `timeout` seconds, or as soon as a
+    NOTIFY from bump_versions() names a snapshot table (PostgreSQL with
+    psycopg2 or psycopg). Anywhere else it is time.sleep and polling alone
+    keeps the snapshot current.
+    """
+    if engine.dialect.name != "postgresql" or engine.dialect.driver not in ("psycopg2", "psycopg"):
+        return time.sleep
+    # A dedicated connection, taken out of the pool for good
+    raw = engine.raw_connection()
+    raw.detach()
+    connection = raw.driver_connection
+
+    if engine.dialect.driver == "psycopg":
+        connection.autocommit = True
+        connection.execute(f"LISTEN {VERSION_CHANNEL}")
+
+        def wait(timeout):
+            for notify in connection.notifies(timeout=timeout):
+                if _touches_snapshot(notify.payload):
+                    return
+        wait.close = connection.close
+        return wait
+
+    connection.set_isolation_level(0)  # autocommit, so notifications are delivered
+    connection.cursor().execute(f"LISTEN {VERSION_CHANNEL}")
+    selector = selectors.DefaultSelector()
+    selector.register(connection, selectors.EVENT_READ)
+
+    def wait(timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not selector.select(remaining):
+                return
+            connection.poll()
+            payloads = [notify.payload for notify in connection.notifies]
+            connection.notifies.clear()
+            if any(_touches_snapshot(payload) for payload in payloads):
+                return
+    wait.close = connection.close
+    return wait
+
+
+def close_waiter(wait):
+    """Closes the LISTEN connection behind a notification_waiter(), if it has one."""
+    try:
+        getattr(wait, "close", lambda: None)()
+    except Exception:
+        logger.debug("closing the catalog snapshot LISTEN connection failed", exc_info=True)
+
+
+def setup_snapshot(app):
+    global catalog
+    if not app.config["CATALOG_SNAPSHOT"]:
+        return
+    from flask import current_app, request
+    from pagination import page_headers
+    from streaming import wants_stream
+
+    catalog = CatalogSnapshot(app, float(os.getenv("CATALOG_POLL_SECONDS", 1.0)))
+    app.extensions["catalog_snapshot"] = catalog
+
+    @app.before_request
+    def serve_from_snapshot():
+        if request.method != "GET" or request.endpoint not in ENDPOINTS:
+            return None
+        catalog.ensure_started()
+        if not catalog.is_fresh():
+            return None
+        result = catalog.serve(request.endpoint, request.view_args, request.args,
+                               request.full_path + "|" + request.headers.get("Accept", ""),
+                               request.if_none_match, request.if_modified_since, wants_stream(), page_headers)
+        if result is None:
+            return None
+        status, body, mimetype, headers = result
+        return current_app.response_class(body, status=status, mimetype=mimetype, headers=headers)
@@ -0,0 +1,41 @@
+from flask import Response, request, stream_with_context
+from sqlalchemy import select
+from models import db
+from pagination import get_after, get_fields
+from serializers import json_body, serializer_for
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_stream():
+    if request.args.get("stream", type=int) == 1:
+        return True
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_rows(model, *criteria):
+    """
+    Sends every matching row of `model` as newline delimited JSON.
+    Rows are fetched through a server-side cursor in STREAM_BATCH_SIZE batches
+    and encoded one line at a time, so memory stays flat for any table size.
+    Honors `fields` and the `after` cursor like the paginated listing.
+    """
+    serialize = serializer_for(model, get_fields(model))
+    stmt = (select(*serialize.columns)
+            .where(*criteria)
+            .order_by(model.ID)
+            .execution_options(yield_per=STREAM_BATCH_SIZE))
+    after = get_after()
+    if after is not None:
+        stmt = stmt.where(model.ID > after)
+
+    def generate():
+        result = db.session.execute(stmt)
+        try:
+            for row in result:
+                yield json_body(serialize(row))
+        finally:
+            result.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
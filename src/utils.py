@@ -1,4 +1,8 @@
-from flask import jsonify, url_for
+import os
+from flask import current_app, jsonify, request, url_for
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db
 
 class APIException(Exception):
     status_code = 400
@@ -15,13 +19,32 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def insert_ignore(model):
+    """INSERT that silently skips rows violating a unique index, so rowcount tells what was written."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing()
+    return insert(model).prefix_with("IGNORE")
+
+def is_internal_request():
+    """
+    True when the request carries INTERNAL_TOKEN (X-Internal-Token or a Bearer token).
+    Without a token configured only debug and testing apps let requests through.
+    """
+    token = os.getenv("INTERNAL_TOKEN")
+    if not token:
+        return current_app.debug or current_app.testing
+    return token in (request.headers.get("X-Internal-Token"), request.headers.get("Authorization", "").removeprefix("Bearer "))
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
     return len(defaults) >= len(arguments)
 
 def generate_sitemap(app):
-    links = ['/admin/']
+    links = ['/admin/'] if 'admin.index' in app.view_functions else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
@@ -0,0 +1,123 @@
+import zlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, g, make_response, request
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.orm import Session
+from models import db, TableVersion
+
+# PostgreSQL channel notified with the bumped table names, see snapshot.py
+VERSION_CHANNEL = "table_version"
+
+
+def bump_versions(connection, tables):
+    """
+    Increments the version counter of every table in `tables` inside the
+    caller's transaction. Core bulk writes that skip the ORM must call this.
+    """
+    now = datetime.now(timezone.utc)
+    for name in sorted(set(tables)):
+        result = connection.execute(
+            update(TableVersion.__table__)
+            .where(TableVersion.__table__.c.name == name)
+            .values(version=TableVersion.__table__.c.version + 1, updated_at=now))
+        if result.rowcount == 0:
+            connection.execute(insert(TableVersion.__table__).values(name=name, version=1, updated_at=now))
+    # Delivered to listeners at commit, and dropped on rollback
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_notify(:channel, :tables)"),
+                           {"channel": VERSION_CHANNEL, "tables": ",".join(sorted(set(tables)))})
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in session.new | session.deleted}
+    tables.update(obj.__table__.name for obj in session.dirty if session.is_modified(obj))
+    tables.discard(TableVersion.__tablename__)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+def versions_statement(tables):
+    return (select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+            .where(TableVersion.name.in_(tables)))
+
+
+def versions_from_rows(tables, rows):
+    found = {row.name: (row.version, row.updated_at) for row in rows}
+    return [found.get(name, (0, None)) for name in tables]
+
+
+def current_versions(tables):
+    """Returns (version, updated_at) per table with one primary key lookup each, no ORM objects."""
+    return versions_from_rows(tables, db.session.execute(versions_statement(tables)).all())
+
+
+def table_version(name):
+    """
+    The version counter of one table, reusing what @conditional read for this
+    request so that a body keyed on it matches the ETag sent with it.
+    """
+    versions = g.get("table_versions", {})
+    if name in versions:
+        return versions[name][0]
+    return current_versions([name])[0][0]
+
+
+def _http_datetime(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def validators(tables, versions, variant):
+    """Returns (etag, last_modified) for the given table versions and request variant (path + Accept)."""
+    variant = zlib.crc32(variant.encode())
+    etag = "-".join(f"{name}.{version}" for name, (version, _) in zip(tables, versions)) + f"-{variant:08x}"
+    stamps = [_http_datetime(updated_at) for _, updated_at in versions if updated_at is not None]
+    return etag, max(stamps) if stamps else None
+
+
+def is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+    # If-Modified-Since only counts when the client sent no ETag (RFC 9110 13.1.3)
+    if if_none_match:
+        return if_none_match.contains(etag)
+    return if_modified_since is not None and last_modified is not None and last_modified <= if_modified_since
+
+
+def request_tables(tables, depends, args):
+    """`tables` plus the ones `depends(args)` names for this request, each once."""
+    return tuple(dict.fromkeys(tables + tuple(depends(args)))) if depends else tables
+
+
+def conditional(*tables, depends=None):
+    """
+    Adds a strong ETag and Last-Modified built from the version counters of
+    `tables` and answers 304 when the client's copy is current, before the
+    view (and the ORM) runs at all. `depends`, called with the query args,
+    names the tables a particular request reads on top of those.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tables_read = request_tables(tables, depends, request.args)
+            versions = current_versions(tables_read)
+            g.table_versions = dict(zip(tables_read, versions))
+            etag, last_modified = validators(tables_read, versions,
+                                             request.full_path + "|" + request.headers.get("Accept", ""))
+            if is_not_modified(request.if_none_match, request.if_modified_since, etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.vary.add("Accept")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+import importlib
+import re
+import pytest
+from datetime import date
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from metrics import request_metrics
+from models import db, Character, Favorite, Follower, Media, Planet, Post, User, enumFaction, enumPost, enumRole
+from pool import engine_options
+
+URLS = ["/api/v1/people", "/api/v1/people/1", "/api/v1/people/99", "/api/v1/planets?limit=1",
+        "/api/v1/users", "/api/v1/users/favorites?user_id=1", "/api/v1/users/favorites?user_id=1&expand=planet",
+        "/api/v1/users?after=abc", "/api/v1/people?limit=0",
+        "/api/v1/people/top", "/api/v1/planets/top?limit=1", "/api/v1/planets/top?limit=0",
+        "/api/v1/planets/1/posts", "/api/v1/planets/1/media?limit=1", "/api/v1/planets/99/posts",
+        "/api/v1/people/1/posts", "/api/v1/people/1/media",
+        "/api/v1/search?q=alde", "/api/v1/search?q=hoth&type=planet&limit=1", "/api/v1/search?q=al",
+        "/api/v1/search?q=leia&type=ship",
+        "/api/v1/users/1/followers", "/api/v1/users/2/followers", "/api/v1/users/1/following?limit=1",
+        "/api/v1/users/1/mutuals", "/api/v1/users/1/relationship/2", "/api/v1/users/1/suggestions",
+        "/api/v1/users/1/suggestions?limit=0",
+        "/api/v1/feed?user_id=1", "/api/v1/feed?user_id=1&limit=1", "/api/v1/feed?user_id=1&after=x", "/api/v1/feed",
+        "/api/v1/users/favorites?user_id=1&expand=planet&stream=1"]
+
+
+@pytest.fixture(scope="module")
+def asgi(tmp_path_factory):
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path_factory.mktemp('asgi') / 'asgi.db'}")
+    monkeypatch.setenv("APP_PROFILE", "api")
+    module = importlib.import_module("asgi")
+    with module.flask_app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(ID=1, username="user1", password="x", firstname="First", lastname="Last", email="user1@example.com"),
+            User(ID=2, username="user2", password="x", firstname="First", lastname="Last", email="user2@example.com"),
+            User(ID=3, username="user3", password="x", firstname="First", lastname="Last", email="user3@example.com"),
+            Planet(ID=1, name="Alderaan", size=12500.0, inhabited=True, distance=10.0, favorite_count=1),
+            Planet(ID=2, name="Hoth", size=7200.0, inhabited=False, distance=20.0),
+            Character(ID=1, fullname="Leia Organa", age=19, faction=list(enumFaction)[0], type=list(enumRole)[0]),
+            Favorite(user_id=1, planet_id=1),
+            Follower(user_from_id=1, user_to_id=2),
+            Follower(user_from_id=2, user_to_id=1),
+            Follower(user_from_id=2, user_to_id=3),
+            Media(ID=1, url="https://example.com/alderaan.png", planet_id=1),
+        ])
+        db.session.add_all([
+            Post(ID=i, description=f"Post {i}", type=enumPost.Planet, creation_date=date(2024, 1, i), user_id=2, planet_id=1)
+            for i in (1, 2)
+        ])
+        db.session.commit()
+    yield module
+    monkeypatch.undo()
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_flask_and_asgi_send_the_same_bytes(asgi, url):
+    headers = {"Accept": "application/json"}
+    flask_response = asgi.flask_app.test_client().get(url, headers=headers)
+    with TestClient(asgi.application) as client:
+        asgi_response = client.get(url, headers=headers)
+    assert asgi_response.status_code == flask_response.status_code
+    assert asgi_response.content == flask_response.data
+    assert asgi_response.headers.get("ETag") == flask_response.headers.get("ETag")
+
+
+def test_every_api_read_route_is_async(asgi):
+    flask_paths = {re.sub(r"<int:(\w+)>", r"{\1:int}", rule.rule) for rule in asgi.flask_app.url_map.iter_rules()
+                   if rule.endpoint.startswith("api.") and "GET" in rule.methods}
+    asgi_paths = {route.path for route in asgi.routes_application.routes if isinstance(route, Route)}
+    assert flask_paths == asgi_paths
+
+
+def test_async_handlers_record_request_metrics(asgi):
+    served = (("endpoint", "api.get_followers"), ("method", "GET"))
+    delegated = (("endpoint", "api.unfollow_user"), ("method", "DELETE"))
+    requests = dict(request_metrics.requests)
+    queries = request_metrics.db_queries._series.get(served, [None, 0])[1]
+    with TestClient(asgi.application) as client:
+        client.get("/api/v1/users/2/followers")
+        client.request("DELETE", "/api/v1/follow/3", json={"user_id": 1})
+    assert request_metrics.requests[served + (("status", "200"),)] == requests.get(served + (("status", "200"),), 0) + 1
+    # The table versions and the page
+    assert request_metrics.db_queries._series[served][1] == queries + 2
+    # Requests left to Flask are recorded once, by its own middleware
+    assert request_metrics.requests[delegated + (("status", "404"),)] == requests.get(delegated + (("status", "404"),), 0) + 1
+
+
+def test_pgbouncer_options_follow_the_async_driver(asgi, monkeypatch):
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    options = engine_options(asgi.async_url("postgresql+psycopg://app@localhost/app"))
+    assert "prepare_threshold" not in options["connect_args"]
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+
+
+def test_editing_an_expanded_row_changes_the_etag(asgi):
+    url = "/api/v1/users/favorites?user_id=1&expand=planet"
+    with TestClient(asgi.application) as client:
+        first = client.get(url)
+        with asgi.flask_app.app_context():
+            db.session.get(Planet, 1).size = 12600.0
+            db.session.commit()
+        second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()[0]["planet"]["size"] == 12600.0
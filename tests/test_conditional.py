@@ -0,0 +1,66 @@
+import pytest
+from models import db, Character, Planet
+
+
+def test_repeat_with_the_etag_is_not_modified(client, sample_data):
+    first = client.get("/api/v1/people")
+    assert first.status_code == 200 and first.headers["Vary"] == "Accept"
+    second = client.get("/api/v1/people", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_repeat_with_last_modified_is_not_modified(client, sample_data):
+    client.post("/api/v1/favorite/planet/1", json={"user_id": 1})
+    first = client.get("/api/v1/users/favorites?user_id=1")
+    response = client.get("/api/v1/users/favorites?user_id=1", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+
+def test_write_to_a_dependency_changes_the_etag(client, sample_data):
+    client.post("/api/v1/favorite/planet/1", json={"user_id": 1})
+    first = client.get("/api/v1/users/favorites?user_id=1")
+    client.post("/api/v1/favorite/planet/2", json={"user_id": 1})
+    second = client.get("/api/v1/users/favorites?user_id=1", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert len(second.json) == 2
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_write_elsewhere_keeps_the_etag(client, sample_data):
+    first = client.get("/api/v1/people")
+    client.post("/api/v1/follow/2", json={"user_id": 1})
+    assert client.get("/api/v1/people", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_etag_depends_on_the_query_and_accept(client, sample_data):
+    etags = {
+        client.get("/api/v1/people").headers["ETag"],
+        client.get("/api/v1/people?limit=1").headers["ETag"],
+        client.get("/api/v1/people", headers={"Accept": "application/x-ndjson"}).headers["ETag"],
+    }
+    assert len(etags) == 3
+
+
+def test_errors_carry_no_etag(client, sample_data):
+    response = client.get("/api/v1/people/99")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+@pytest.mark.parametrize("expand, model", [("planet", Planet), ("character", Character)])
+def test_editing_an_expanded_row_changes_the_etag(client, sample_data, expand, model):
+    client.post("/api/v1/favorite/planet/1", json={"user_id": 1})
+    client.post("/api/v1/favorite/people/1", json={"user_id": 1})
+    url = f"/api/v1/users/favorites?user_id=1&expand={expand}"
+    first = client.get(url)
+    row = db.session.get(model, 1)
+    if model is Planet:
+        row.name = "Renamed"
+    else:
+        row.fullname = "Renamed"
+    db.session.commit()
+    second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert "Renamed" in second.get_data(as_text=True)
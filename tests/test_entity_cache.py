@@ -0,0 +1,30 @@
+from sqlalchemy import update
+from models import db, Character, enumFaction, enumRole
+from versioning import bump_versions
+
+
+def add_character(app):
+    db.session.add(Character(ID=1, fullname="Leia Organa", age=19, faction=list(enumFaction)[0], type=list(enumRole)[0]))
+    db.session.commit()
+
+
+def test_cache_hit_skips_the_row_query(app, client, assert_max_queries):
+    add_character(app)
+    assert client.get("/api/v1/people/1").json["fullname"] == "Leia Organa"
+    with assert_max_queries(1):
+        assert client.get("/api/v1/people/1").json["fullname"] == "Leia Organa"
+
+
+def test_write_from_another_worker_is_seen_right_away(app, client):
+    add_character(app)
+    first = client.get("/api/v1/people/1")
+
+    # Another process: no ORM events fire in this one, only the table version moves
+    with db.engine.begin() as connection:
+        connection.execute(update(Character.__table__).where(Character.ID == 1).values(fullname="General Organa"))
+        bump_versions(connection, ["character"])
+
+    second = client.get("/api/v1/people/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json["fullname"] == "General Organa"
+    assert second.headers["ETag"] != first.headers["ETag"]
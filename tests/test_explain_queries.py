@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import func, select
+from commands import capture_statements, scanned_tables, table_rows, write_requests
+from models import db, Favorite, Follower, Post
+
+
+@pytest.mark.parametrize("statement, scanned", [
+    ('SELECT "ID" FROM post ORDER BY "ID" LIMIT 51', set()),
+    ('SELECT "ID" FROM post WHERE description = ? ORDER BY "ID" LIMIT 51', {"post"}),
+    ('SELECT "ID" FROM post WHERE description = ?', {"post"}),
+    ('SELECT "ID" FROM post WHERE "ID" > ? ORDER BY "ID" LIMIT 51', set()),
+])
+def test_sqlite_scans(app, statement, scanned):
+    parameters = ("x",) if "?" in statement else ()
+    with db.engine.connect() as connection:
+        assert scanned_tables(connection, statement, parameters) == scanned
+
+
+def test_write_routes_are_explained_and_rolled_back(app, sample_data):
+    statements = [" ".join(statement.split()) for statement, _ in capture_statements(app, [], write_requests(app, 1))]
+    assert any(statement.startswith("INSERT INTO follower (user_from_id, user_to_id) SELECT") for statement in statements)
+    assert any(statement.startswith("INSERT INTO favorite") for statement in statements)
+    assert any(statement.startswith("DELETE FROM favorite") for statement in statements)
+    assert any(statement.startswith("UPDATE planet SET favorite_count") for statement in statements)
+    for model in (Favorite, Follower, Post):
+        assert db.session.scalar(select(func.count()).select_from(model)) == 0
+
+
+class NeverAnalyzed:
+    """A PostgreSQL connection whose pg_class has reltuples = -1 and whose table holds 25000 rows."""
+
+    class dialect:
+        name = "postgresql"
+
+    def execute(self, statement, parameters=None):
+        result = -1.0 if "reltuples" in str(statement) else 25000
+        return type("Result", (), {"scalar": lambda self: result})()
+
+
+def test_never_analyzed_tables_are_counted():
+    assert table_rows(NeverAnalyzed(), "favorite") == 25000
@@ -0,0 +1,56 @@
+import pytest
+from models import db, Character, Favorite, Planet
+from routes import MAX_FAVORITE_BATCH
+
+
+def batch(client, method, user_id, items):
+    return getattr(client, method)("/api/v1/favorites/batch", json={"user_id": user_id, "items": items})
+
+
+def test_add_reports_a_status_per_item(client, sample_data):
+    client.post("/api/v1/favorite/planet/2", json={"user_id": 1})
+    response = batch(client, "post", 1, [
+        {"planet_id": 1}, {"planet_id": 2}, {"planet_id": 99}, {"character_id": 3}, {"character_id": 3},
+        {"planet_id": 1, "character_id": 1}, {"planet_id": "1"}, "planet"])
+    assert response.status_code == 200
+    assert response.json == {"user_id": 1, "results": [
+        {"planet_id": 1, "status": "added"},
+        {"planet_id": 2, "status": "duplicate"},
+        {"planet_id": 99, "status": "not_found"},
+        {"character_id": 3, "status": "added"},
+        {"character_id": 3, "status": "duplicate"},
+        {"status": "invalid"},
+        {"status": "invalid"},
+        {"status": "invalid"},
+    ]}
+    assert db.session.query(Favorite).filter_by(user_id=1).count() == 3
+    assert db.session.get(Planet, 1).favorite_count == 1
+    assert db.session.get(Character, 3).favorite_count == 1
+
+
+def test_delete_reports_a_status_per_item(client, sample_data):
+    batch(client, "post", 1, [{"planet_id": 1}, {"character_id": 2}])
+    response = batch(client, "delete", 1, [{"planet_id": 1}, {"planet_id": 1}, {"character_id": 3}, {}])
+    assert response.status_code == 200
+    assert response.json["results"] == [
+        {"planet_id": 1, "status": "deleted"},
+        {"planet_id": 1, "status": "not_found"},
+        {"character_id": 3, "status": "not_found"},
+        {"status": "invalid"},
+    ]
+    assert [favorite.character_id for favorite in db.session.query(Favorite).filter_by(user_id=1)] == [2]
+    assert db.session.get(Planet, 1).favorite_count == 0
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"items": [{"planet_id": 1}]}, "user_id is required"),
+    ({"user_id": 1, "items": []}, "items must be a non empty list"),
+    ({"user_id": 1, "items": {"planet_id": 1}}, "items must be a non empty list"),
+    ({"user_id": 1, "items": [{"planet_id": 1}] * (MAX_FAVORITE_BATCH + 1)},
+     f"items can have at most {MAX_FAVORITE_BATCH} entries"),
+])
+def test_invalid_batch(client, sample_data, body, message):
+    response = client.post("/api/v1/favorites/batch", json=body)
+    assert response.status_code == 400
+    assert response.json == {"message": message}
+    assert db.session.query(Favorite).count() == 0
@@ -0,0 +1,60 @@
+import threading
+import pytest
+from app import create_app
+from models import db, Character, Favorite, Planet, User, enumFaction, enumRole
+
+TARGETS = [("planet", "planet_id"), ("people", "character_id")]
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    # A file, not :memory:, so requests on other threads get their own connections
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'favorites.db'}",
+        "ENABLE_ADMIN": False,
+        "ENABLE_MIGRATE": False,
+        "ENABLE_SWAGGER": False,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(ID=1, username="luke", password="x", firstname="Luke", lastname="Skywalker", email="luke@example.com"),
+            Planet(ID=1, name="Tatooine", size=10465, inhabited=True, distance=43000),
+            Character(ID=1, fullname="Leia Organa", age=19, faction=list(enumFaction)[0], type=list(enumRole)[0]),
+        ])
+        db.session.add_all([Favorite(user_id=1, planet_id=1), Favorite(user_id=1, character_id=1)])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.mark.parametrize("path, field", TARGETS)
+def test_double_delete(file_app, path, field):
+    client = file_app.test_client()
+    first = client.delete(f"/api/v1/favorite/{path}/1", json={"user_id": 1})
+    second = client.delete(f"/api/v1/favorite/{path}/1", json={"user_id": 1})
+    assert (first.status_code, second.status_code) == (200, 404)
+
+
+@pytest.mark.parametrize("path, field", TARGETS)
+def test_concurrent_deletes(file_app, path, field):
+    clients = 8
+    barrier = threading.Barrier(clients)
+    statuses = []
+
+    def delete():
+        client = file_app.test_client()
+        barrier.wait()
+        statuses.append(client.delete(f"/api/v1/favorite/{path}/1", json={"user_id": 1}).status_code)
+
+    threads = [threading.Thread(target=delete) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200] + [404] * (clients - 1)
+    with file_app.app_context():
+        assert db.session.query(Favorite).filter(getattr(Favorite, field) == 1).count() == 0
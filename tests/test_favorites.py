@@ -0,0 +1,63 @@
+import json
+import pytest
+from models import db, Favorite
+
+TARGETS = [("planet", "planet_id", "Planet"), ("people", "character_id", "Character")]
+
+
+@pytest.mark.parametrize("path, field, label", TARGETS)
+def test_add_once(client, sample_data, path, field, label):
+    response = client.post(f"/api/v1/favorite/{path}/1", json={"user_id": 1})
+    assert response.status_code == 201
+    assert db.session.query(Favorite).filter_by(user_id=1, **{field: 1}).count() == 1
+
+
+@pytest.mark.parametrize("path, field, label", TARGETS)
+def test_duplicate_add_is_a_no_op(client, sample_data, path, field, label):
+    client.post(f"/api/v1/favorite/{path}/1", json={"user_id": 1})
+    response = client.post(f"/api/v1/favorite/{path}/1", json={"user_id": 1})
+    assert response.status_code == 400
+    assert response.json == {"error": f"{label} already in favorites"}
+    assert db.session.query(Favorite).filter_by(user_id=1, **{field: 1}).count() == 1
+
+
+@pytest.mark.parametrize("path, field, label", TARGETS)
+def test_add_unknown_target(client, sample_data, path, field, label):
+    response = client.post(f"/api/v1/favorite/{path}/99", json={"user_id": 1})
+    assert response.status_code == 404
+    assert response.json == {"error": f"{label} not found"}
+    assert db.session.query(Favorite).count() == 0
+
+
+@pytest.mark.parametrize("path, field, label", TARGETS)
+def test_user_id_sent_as_a_string(client, sample_data, path, field, label):
+    assert client.post(f"/api/v1/favorite/{path}/1", json={"user_id": "2"}).status_code == 201
+    favorite = db.session.query(Favorite).one()
+    assert favorite.user_id == 2 and type(favorite.user_id) is int
+    assert client.delete(f"/api/v1/favorite/{path}/1", json={"user_id": "2"}).status_code == 200
+
+
+@pytest.mark.parametrize("user_id", ["luke", 1.5, True, [1]])
+def test_invalid_user_id(client, sample_data, user_id):
+    response = client.post("/api/v1/favorite/planet/1", json={"user_id": user_id})
+    assert response.status_code == 400
+    assert response.json == {"message": "user_id must be an integer"}
+
+
+def test_missing_user_id(client, sample_data):
+    assert client.post("/api/v1/favorite/planet/1", json={}).status_code == 400
+
+
+@pytest.mark.parametrize("args, headers", [("&stream=1", {}), ("", {"Accept": "application/x-ndjson"})])
+def test_streaming_rejects_expand(client, sample_data, args, headers):
+    client.post("/api/v1/favorite/planet/1", json={"user_id": 1})
+    response = client.get(f"/api/v1/users/favorites?user_id=1&expand=planet{args}", headers=headers)
+    assert response.status_code == 400
+    assert response.json == {"error": "expand can't be combined with streaming"}
+
+
+def test_streaming_without_expand(client, sample_data):
+    client.post("/api/v1/favorite/planet/1", json={"user_id": 1})
+    response = client.get("/api/v1/users/favorites?user_id=1&stream=1")
+    assert response.mimetype == "application/x-ndjson"
+    assert [line["planet_id"] for line in map(json.loads, response.data.splitlines())] == [1]
@@ -0,0 +1,75 @@
+import pytest
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from feed import followed_posts_statement, rebuild_timelines
+from models import db, Post, Timeline
+from serializers import serializer_for
+
+
+@pytest.fixture(params=["read", "write"])
+def strategy(request, app, sample_data):
+    app.config["FEED_STRATEGY"] = request.param
+    return request.param
+
+
+def post(client, user_id, description):
+    response = client.post("/api/v1/posts", json={"user_id": user_id, "description": description, "planet_id": 1})
+    assert response.status_code == 201
+    return response.json["ID"]
+
+
+def feed(client, user_id, **args):
+    response = client.get("/api/v1/feed", query_string=dict(args, user_id=user_id))
+    assert response.status_code == 200
+    return response
+
+
+def test_feed_lists_followed_posts_newest_first(client, strategy):
+    before = post(client, 2, "Before the follow")
+    post(client, 3, "Not followed")
+    assert client.post("/api/v1/follow/2", json={"user_id": 1}).status_code == 201
+    after = post(client, 2, "After the follow")
+    assert [item["ID"] for item in feed(client, 1).json] == [after, before]
+
+
+def test_feed_pages_with_the_cursor(client, strategy):
+    client.post("/api/v1/follow/2", json={"user_id": 1})
+    ids = [post(client, 2, f"Post {i}") for i in range(3)]
+    first = feed(client, 1, limit=2)
+    assert [item["ID"] for item in first.json] == ids[:0:-1]
+    last = feed(client, 1, limit=2, after=first.headers["X-Next-Cursor"])
+    assert [item["ID"] for item in last.json] == ids[:1]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_unfollow_empties_the_feed(client, strategy):
+    client.post("/api/v1/follow/2", json={"user_id": 1})
+    post(client, 2, "Hello")
+    assert client.delete("/api/v1/follow/2", json={"user_id": 1}).status_code == 200
+    assert feed(client, 1).json == []
+
+
+def test_rebuild_matches_the_written_timelines(client, app, sample_data):
+    app.config["FEED_STRATEGY"] = "write"
+    client.post("/api/v1/follow/2", json={"user_id": 1})
+    client.post("/api/v1/follow/3", json={"user_id": 2})
+    for user_id in (2, 3, 3):
+        post(client, user_id, "Hello")
+    rows = select(Timeline.user_id, Timeline.post_id).order_by(Timeline.user_id, Timeline.post_id)
+    written = db.session.execute(rows).all()
+    assert len(written) == 3
+    with db.engine.begin() as connection:
+        rebuild_timelines(connection)
+    assert db.session.execute(rows).all() == written
+
+
+def test_read_strategy_reads_one_page_per_followee_on_postgresql(app):
+    stmt = followed_posts_statement("postgresql", serializer_for(Post), 1, 20, (date(2024, 1, 1), 5))
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    lateral, _, outer = sql.partition(") AS latest ON true")
+    assert "JOIN LATERAL" in lateral
+    assert "post.user_id = follower.user_to_id" in lateral
+    assert "(post.creation_date, post.\"ID\") < ('2024-01-01', 5)" in lateral
+    assert lateral.rstrip().endswith("LIMIT 21")
+    assert outer.rstrip().endswith("LIMIT 21")
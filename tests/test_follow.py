@@ -0,0 +1,46 @@
+import pytest
+from models import db, Follower, User
+
+
+def test_follow_once(client, sample_data):
+    assert client.post("/api/v1/follow/2", json={"user_id": 1}).status_code == 201
+    response = client.post("/api/v1/follow/2", json={"user_id": 1})
+    assert response.status_code == 400
+    assert response.json == {"error": "User already followed"}
+    assert db.session.query(Follower).filter_by(user_from_id=1, user_to_id=2).count() == 1
+
+
+def test_follow_unknown_user(client, sample_data):
+    assert client.post("/api/v1/follow/99", json={"user_id": 1}).status_code == 404
+    assert db.session.query(Follower).count() == 0
+
+
+def test_user_id_sent_as_a_string(client, sample_data):
+    assert client.post("/api/v1/follow/2", json={"user_id": "1"}).status_code == 201
+    follower = db.session.query(Follower).one()
+    assert follower.user_from_id == 1 and type(follower.user_from_id) is int
+    assert client.delete("/api/v1/follow/2", json={"user_id": "1"}).status_code == 200
+    assert client.delete("/api/v1/follow/2", json={"user_id": "1"}).status_code == 404
+
+
+@pytest.mark.parametrize("method", ["post", "delete"])
+@pytest.mark.parametrize("user_id", ["luke", 1.5, True, [1]])
+def test_invalid_user_id(client, sample_data, method, user_id):
+    response = getattr(client, method)("/api/v1/follow/2", json={"user_id": user_id})
+    assert response.status_code == 400
+    assert response.json == {"message": "user_id must be an integer"}
+
+
+@pytest.mark.parametrize("url", ["/api/v1/users/1/followers", "/api/v1/users/1/following",
+                                 "/api/v1/users/1/mutuals", "/api/v1/users/3/suggestions"])
+def test_renamed_user_changes_the_etag(client, sample_data, url):
+    client.post("/api/v1/follow/2", json={"user_id": 1})
+    client.post("/api/v1/follow/1", json={"user_id": 2})
+    client.post("/api/v1/follow/1", json={"user_id": 3})
+    first = client.get(url)
+    assert first.json[0]["username"] == "user2"
+    db.session.get(User, 2).username = "renamed"
+    db.session.commit()
+    second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json[0]["username"] == "renamed"
@@ -0,0 +1,25 @@
+import pytest
+
+INTERNAL_URLS = ["/internal/pool", "/metrics"]
+
+
+@pytest.mark.parametrize("url", INTERNAL_URLS)
+def test_open_in_testing_without_a_token(client, monkeypatch, url):
+    monkeypatch.delenv("INTERNAL_TOKEN", raising=False)
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize("url", INTERNAL_URLS)
+def test_closed_in_production_without_a_token(app, client, monkeypatch, url):
+    monkeypatch.delenv("INTERNAL_TOKEN", raising=False)
+    app.testing = False
+    assert client.get(url).status_code == 403
+
+
+@pytest.mark.parametrize("url", INTERNAL_URLS)
+def test_token(app, client, monkeypatch, url):
+    monkeypatch.setenv("INTERNAL_TOKEN", "s3cret")
+    app.testing = False
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers={"X-Internal-Token": "s3cret"}).status_code == 200
+    assert client.get(url, headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,37 @@
+import pytest
+
+# (path, the query args it needs)
+LISTINGS = [
+    ("/api/v1/people", {}), ("/api/v1/planets", {}), ("/api/v1/users", {}),
+    ("/api/v1/people/1/posts", {}), ("/api/v1/planets/1/media", {}),
+    ("/api/v1/users/1/followers", {}), ("/api/v1/users/1/following", {}), ("/api/v1/users/1/mutuals", {}),
+    ("/api/v1/search", {"q": "Planet"}), ("/api/v1/feed", {"user_id": 1}),
+]
+STREAMS = [("/api/v1/users", {"stream": 1}), ("/api/v1/people", {"stream": 1})]
+# Listings whose cursor is a bare ID, the others reject a negative one as an invalid cursor or offset
+ID_CURSORS = [("/api/v1/users", {}), ("/api/v1/people/1/posts", {}), ("/api/v1/users/1/followers", {}),
+              ("/api/v1/users", {"stream": 1})]
+
+
+@pytest.mark.parametrize("path, args", LISTINGS + STREAMS)
+@pytest.mark.parametrize("after", ["abc", "1.5", "99999999999999999999999"])
+def test_invalid_after_is_rejected(client, sample_data, path, args, after):
+    assert client.get(path, query_string=dict(args, after=after)).status_code == 400
+
+
+@pytest.mark.parametrize("path, args", ID_CURSORS)
+def test_negative_after_is_rejected(client, sample_data, path, args):
+    response = client.get(path, query_string=dict(args, after=-1))
+    assert response.status_code == 400
+    assert response.json == {"message": "after must be between 0 and 9223372036854775807"}
+
+
+@pytest.mark.parametrize("path, args", LISTINGS)
+@pytest.mark.parametrize("limit", ["abc", "0", "-5"])
+def test_invalid_limit_is_rejected(client, sample_data, path, args, limit):
+    assert client.get(path, query_string=dict(args, limit=limit)).status_code == 400
+
+
+def test_valid_arguments_still_page(client, sample_data):
+    assert [user["ID"] for user in client.get("/api/v1/users?limit=2").json] == [1, 2]
+    assert [user["ID"] for user in client.get("/api/v1/users?limit=2&after=2").json] == [3]
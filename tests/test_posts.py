@@ -0,0 +1,45 @@
+import pytest
+from models import db, Post, enumPost
+
+
+def test_create_post(client, sample_data):
+    response = client.post("/api/v1/posts", json={"user_id": "1", "description": "Hello", "character_id": 2})
+    assert response.status_code == 201
+    post = db.session.get(Post, response.json["ID"])
+    assert (post.user_id, post.character_id, post.type) == (1, 2, enumPost.Character)
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"user_id": "luke", "description": "Hello", "planet_id": 1}, "user_id must be an integer"),
+    ({"user_id": 1, "description": "Hello", "planet_id": "alderaan"}, "planet_id must be an integer"),
+    ({"user_id": 1, "description": "Hello", "character_id": [1]}, "character_id must be an integer"),
+    ({"user_id": 1, "description": "Hello", "planet_id": True}, "planet_id must be an integer"),
+    ({"user_id": 1, "description": ["Hello"], "planet_id": 1}, "description must be a string"),
+])
+def test_invalid_field(client, sample_data, body, message):
+    response = client.post("/api/v1/posts", json=body)
+    assert response.status_code == 400
+    assert response.json == {"message": message}
+
+
+@pytest.mark.parametrize("body", [
+    {"description": "Hello", "planet_id": 1},
+    {"user_id": 1, "planet_id": 1},
+    {"user_id": 1, "description": "Hello"},
+    {"user_id": 1, "description": "Hello", "planet_id": 1, "character_id": 1},
+])
+def test_missing_or_extra_field(client, sample_data, body):
+    assert client.post("/api/v1/posts", json=body).status_code == 400
+
+
+def test_missing_body(client, sample_data):
+    assert client.post("/api/v1/posts", data="not json", content_type="text/plain").status_code == 400
+    assert db.session.query(Post).count() == 0
+
+
+@pytest.mark.parametrize("body", [
+    {"user_id": 99, "description": "Hello", "planet_id": 1},
+    {"user_id": 1, "description": "Hello", "planet_id": 99},
+])
+def test_unknown_user_or_target(client, sample_data, body):
+    assert client.post("/api/v1/posts", json=body).status_code == 404
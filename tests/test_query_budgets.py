@@ -0,0 +1,59 @@
+"""One request per api route, with the most statements it may run."""
+import pytest
+from models import db, Favorite, Follower, Media, Post, enumPost
+
+ROUTES = [
+    ("get", "/api/v1/people", None, 2),
+    ("get", "/api/v1/people?include=media", None, 3),
+    ("get", "/api/v1/people?stream=1", None, 2),
+    ("get", "/api/v1/people/1", None, 2),
+    ("get", "/api/v1/people/top", None, 2),
+    ("get", "/api/v1/planets?inhabited=true&sort=-size", None, 2),
+    ("get", "/api/v1/planets/1", None, 2),
+    ("get", "/api/v1/planets/top", None, 2),
+    ("get", "/api/v1/people/1/posts", None, 2),
+    ("get", "/api/v1/people/1/media", None, 2),
+    ("get", "/api/v1/planets/1/posts", None, 2),
+    ("get", "/api/v1/planets/1/media", None, 2),
+    ("get", "/api/v1/search?q=Planet", None, 3),
+    ("get", "/api/v1/users", None, 2),
+    ("get", "/api/v1/users/favorites?user_id=1&expand=planet,character", None, 2),
+    ("post", "/api/v1/favorite/planet/3", {"user_id": 1}, 3),
+    ("post", "/api/v1/favorite/people/3", {"user_id": 1}, 3),
+    ("delete", "/api/v1/favorite/planet/1", {"user_id": 1}, 3),
+    ("delete", "/api/v1/favorite/people/1", {"user_id": 1}, 3),
+    ("post", "/api/v1/favorites/batch", {"user_id": 2, "items": [{"planet_id": 1}, {"planet_id": 2}, {"character_id": 3}]}, 7),
+    ("delete", "/api/v1/favorites/batch", {"user_id": 1, "items": [{"planet_id": 1}, {"character_id": 1}]}, 5),
+    ("get", "/api/v1/users/1/followers", None, 2),
+    ("get", "/api/v1/users/1/following", None, 2),
+    ("get", "/api/v1/users/1/mutuals", None, 2),
+    ("get", "/api/v1/users/1/relationship/2", None, 2),
+    ("get", "/api/v1/users/1/suggestions", None, 2),
+    ("post", "/api/v1/follow/3", {"user_id": 1}, 2),
+    ("delete", "/api/v1/follow/2", {"user_id": 1}, 2),
+    ("get", "/api/v1/feed?user_id=1", None, 2),
+    ("post", "/api/v1/posts", {"user_id": 1, "description": "Hello", "planet_id": 1}, 5),
+]
+
+
+@pytest.fixture
+def social_data(sample_data):
+    """On top of sample_data: user 1 follows 2, 2 follows 1 and 3, favorites, posts and media."""
+    db.session.add_all([
+        Follower(user_from_id=1, user_to_id=2), Follower(user_from_id=2, user_to_id=1), Follower(user_from_id=2, user_to_id=3),
+        Favorite(user_id=1, planet_id=1), Favorite(user_id=1, character_id=1),
+        Post(description="Post 1", type=enumPost.Planet, user_id=2, planet_id=1),
+        Post(description="Post 2", type=enumPost.Character, user_id=3, character_id=1),
+        Media(url="https://example.com/1.png", planet_id=1), Media(url="https://example.com/2.png", character_id=1),
+    ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize("method, url, body, limit", ROUTES, ids=[f"{route[0]} {route[1]}" for route in ROUTES])
+def test_query_budget(client, social_data, assert_max_queries, method, url, body, limit):
+    with assert_max_queries(limit):
+        response = getattr(client, method)(url, json=body)
+        # Reads streamed bodies to the end, so their statements are counted too
+        response.get_data()
+        response.close()
+    assert response.status_code < 400
@@ -0,0 +1,21 @@
+import replicas
+
+
+def test_sticky_users_only_keeps_recent_writers(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(replicas.time, "time", lambda: clock[0])
+    monkeypatch.setattr(replicas, "_sticky_users", {})
+
+    for user_id in range(1000):
+        replicas._pin_user(user_id, clock[0] + 5)
+        clock[0] += 0.01
+    # Writers of the last 5 seconds only
+    assert len(replicas._sticky_users) == 501
+    assert replicas.is_sticky(999, None)
+    assert not replicas.is_sticky(0, None)
+
+    # A repeated writer moves to the back and survives the writers pinned before it
+    replicas._pin_user(950, clock[0] + 5)
+    clock[0] += 4.995
+    replicas._pin_user(7, clock[0] + 5)
+    assert list(replicas._sticky_users) == [950, 7]
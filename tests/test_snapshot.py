@@ -0,0 +1,68 @@
+import pytest
+import snapshot
+from app import create_app
+from models import db, Character, Planet, enumFaction, enumRole
+from snapshot import CatalogSnapshot
+
+URLS = ["/api/v1/people", "/api/v1/people/1", "/api/v1/people/99", "/api/v1/planets?limit=1",
+        "/api/v1/planets?limit=1&after=1", "/api/v1/planets/2", "/api/v1/people?stream=1",
+        "/api/v1/people?after=abc", "/api/v1/planets?limit=0"]
+
+
+@pytest.fixture
+def apps(tmp_path, monkeypatch):
+    # The refresh thread is not needed, ensure_started() already loaded the tables
+    monkeypatch.setattr(CatalogSnapshot, "watch", lambda self: None)
+    config = {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'snapshot.db'}",
+              "ENABLE_ADMIN": False, "ENABLE_MIGRATE": False, "ENABLE_SWAGGER": False}
+    database_app = create_app(dict(config, CATALOG_SNAPSHOT=False))
+    snapshot_app = create_app(dict(config, CATALOG_SNAPSHOT=True))
+    with database_app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Planet(ID=1, name="Alderaan", size=12500.0, inhabited=True, distance=10.0),
+            Planet(ID=2, name="Hoth", size=7200.0, inhabited=False, distance=20.0),
+            Character(ID=1, fullname="Leia Organa", age=19, faction=list(enumFaction)[0], type=list(enumRole)[0]),
+        ])
+        db.session.commit()
+    yield database_app, snapshot_app
+    with database_app.app_context():
+        db.engine.dispose()
+    with snapshot_app.app_context():
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_snapshot_sends_the_database_bytes(apps, url):
+    database_app, snapshot_app = apps
+    from_database = database_app.test_client().get(url)
+    from_snapshot = snapshot_app.test_client().get(url)
+    assert snapshot_app.extensions["catalog_snapshot"].tables
+    assert from_snapshot.status_code == from_database.status_code
+    assert from_snapshot.data == from_database.data
+    assert from_snapshot.headers.get("ETag") == from_database.headers.get("ETag")
+
+
+class Stop(BaseException):
+    pass
+
+
+def test_watch_replaces_a_failed_listen_connection(app, monkeypatch):
+    waiters, closed, calls = [], [], []
+
+    def notification_waiter(engine):
+        def wait(timeout):
+            calls.append(wait)
+            if len(waiters) == 1 and len(calls) < 3:
+                raise OSError("server closed the connection")
+            raise Stop
+        wait.close = lambda: closed.append(wait)
+        waiters.append(wait)
+        return wait
+
+    monkeypatch.setattr(snapshot, "notification_waiter", notification_waiter)
+    with pytest.raises(Stop):
+        CatalogSnapshot(app, poll_seconds=0).watch()
+    assert len(waiters) == 2
+    assert calls == waiters
+    assert closed == waiters[:1]
@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from check_startup import DEFERRED_PACKAGES, measure
+
+
+@pytest.fixture(scope="module")
+def imported():
+    return {profile: measure(profile)[1] for profile in ("full", "api")}
+
+
+def test_api_profile_skips_the_deferred_packages(imported):
+    assert not set(DEFERRED_PACKAGES) & imported["api"]
+
+
+def test_full_profile_still_loads_them(imported):
+    # flask_swagger is only imported when /swagger.json is requested
+    assert {"flask_admin", "flask_migrate"} <= imported["full"]